@@ -0,0 +1,362 @@
+import math
+import subprocess
+import threading
+import time
+
+from tracing import tracer
+
+
+class EmaFilter:
+    # Exponential moving average, alpha = weight of the newest sample
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.value = None
+
+    def __call__(self, value, now):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+    def reset(self):
+        self.value = None
+
+
+class OneEuroFilter:
+    # One Euro filter: smooth when the hand is still, responsive when it moves
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, value, now):
+        if self.value is None:
+            self.value, self.derivative, self.last_time = value, 0.0, now
+            return value
+
+        dt = max(now - self.last_time, 1e-6)
+        self.last_time = now
+
+        derivative = (value - self.value) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        self.derivative += a_d * (derivative - self.derivative)
+
+        cutoff = self.min_cutoff + self.beta * abs(self.derivative)
+        self.value += self._alpha(cutoff, dt) * (value - self.value)
+        return self.value
+
+    def reset(self):
+        self.value = None
+        self.derivative = 0.0
+        self.last_time = None
+
+
+class PycawVolumeBackend:
+    # Windows master volume through the audio endpoint
+    name = 'pycaw'
+
+    def __init__(self):
+        from comtypes import CLSCTX_ALL
+        from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+        devices = AudioUtilities.GetSpeakers()
+        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+        self.volume = interface.QueryInterface(IAudioEndpointVolume)
+
+    def get_level(self):
+        return self.volume.GetMasterVolumeLevelScalar()
+
+    def set_level(self, level):
+        self.volume.SetMasterVolumeLevelScalar(level, None)
+
+
+class PulseAudioVolumeBackend:
+    # Default sink volume through pactl, for Linux machines
+    name = 'pulseaudio'
+
+    def __init__(self, sink='@DEFAULT_SINK@'):
+        self.sink = sink
+        self.level = None
+
+    def get_level(self):
+        return self.level
+
+    def set_level(self, level):
+        subprocess.run(['pactl', 'set-sink-volume', self.sink, f"{round(level * 100)}%"],
+                       check=True, capture_output=True)
+        self.level = level
+
+
+class StubVolumeBackend:
+    # Remembers every write, for tests and machines without an audio device
+    name = 'stub'
+
+    def __init__(self, level=0.5):
+        self.level = level
+        self.writes = []
+
+    def get_level(self):
+        return self.level
+
+    def set_level(self, level):
+        self.level = level
+        self.writes.append(level)
+
+
+def create_volume_backend(name=None):
+    # name: 'pycaw', 'pulseaudio', 'stub' or None to pick what works here
+    backends = {
+        'pycaw': PycawVolumeBackend,
+        'pulseaudio': PulseAudioVolumeBackend,
+        'stub': StubVolumeBackend,
+    }
+    if name is not None:
+        return backends[name]()
+
+    for candidate in (PycawVolumeBackend, PulseAudioVolumeBackend):
+        try:
+            if candidate is PulseAudioVolumeBackend:
+                subprocess.run(['pactl', 'info'], check=True, capture_output=True)
+            return candidate()
+        except Exception:
+            continue
+    print("No audio backend available, volume control disabled")
+    return StubVolumeBackend()
+
+
+class VolumeActuator:
+    # Smooths requested volume levels and only writes to the backend when the
+    # smoothed value moved past the dead band, at most max_rate times a second.
+    # A value held back by the rate limit is written by a later update or flush().
+    def __init__(self, backend, smoothing='one_euro', dead_band=0.02, max_rate=10.0,
+                 precision=2):
+        self.backend = backend
+        self.filter = EmaFilter() if smoothing == 'ema' else OneEuroFilter()
+        self.dead_band = dead_band
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.precision = precision
+
+        self.writes = 0
+        self.suppressed = 0
+        self.errors = 0
+
+        self._written = None
+        self._last_write = float('-inf')
+        self._pending = None
+
+    @property
+    def level(self):
+        return self._written
+
+    def update(self, level, now=None):
+        now = time.perf_counter() if now is None else now
+        smoothed = round(min(max(self.filter(level, now), 0.0), 1.0), self.precision)
+
+        if self._written is not None and (
+                smoothed == self._written or abs(smoothed - self._written) < self.dead_band):
+            self._pending = None
+            self.suppressed += 1
+            return False
+
+        if now - self._last_write < self.min_interval:
+            self._pending = smoothed
+            self.suppressed += 1
+            return False
+
+        return self._write(smoothed, now)
+
+    def flush(self, now=None):
+        # Write a value the rate limit held back, once it's allowed
+        if self._pending is None:
+            return False
+        now = time.perf_counter() if now is None else now
+        if now - self._last_write < self.min_interval:
+            return False
+        return self._write(self._pending, now)
+
+    def set_immediately(self, level):
+        # Manual changes (e.g. a slider) bypass smoothing and rate limiting
+        self.filter.reset()
+        return self._write(round(min(max(level, 0.0), 1.0), self.precision), time.perf_counter())
+
+    def stats(self):
+        return {
+            'backend': self.backend.name,
+            'writes': self.writes,
+            'suppressed': self.suppressed,
+            'errors': self.errors,
+            'level': self._written,
+        }
+
+    def _write(self, level, now):
+        self._pending = None
+        self._last_write = now
+        try:
+            with tracer.span('volume.write', 'actuator'):
+                self.backend.set_level(level)
+        except Exception as e:
+            self.errors += 1
+            print(f"Volume control error: {e}")
+            return False
+        self._written = level
+        self.writes += 1
+        return True
+
+
+class PyAutoGuiCursorBackend:
+    name = 'pyautogui'
+
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def move(self, x, y):
+        # _pause=False skips pyautogui's 100 ms sleep after every call
+        self.pyautogui.moveTo(x, y, _pause=False)
+
+    def click(self):
+        self.pyautogui.click(_pause=False)
+
+
+class StubCursorBackend:
+    name = 'stub'
+
+    def __init__(self):
+        self.moves = []
+        self.clicks = 0
+
+    def move(self, x, y):
+        self.moves.append((x, y))
+
+    def click(self):
+        self.clicks += 1
+
+
+class ScreenGeometry:
+    # Cached desktop bounds (left, top, width, height) spanning every monitor.
+    # provider is only called again after invalidate(), e.g. on a display change.
+    def __init__(self, provider):
+        self.provider = provider
+        self.refreshes = 0
+        self._geometry = None
+
+    def get(self):
+        if self._geometry is None:
+            self._geometry = tuple(self.provider())
+            self.refreshes += 1
+        return self._geometry
+
+    def invalidate(self):
+        self._geometry = None
+
+
+class CursorActuator:
+    # Moves the cursor from its own thread. Callers only set a target, the
+    # thread glides towards it at rate Hz so nothing on the GUI thread blocks.
+    def __init__(self, backend, rate=60.0, smoothing=0.35, min_step=1.0):
+        self.backend = backend
+        self.rate = rate
+        self.smoothing = smoothing
+        self.min_step = min_step
+
+        self.moves = 0
+        self.clicks = 0
+        self.errors = 0
+
+        self._target = None
+        self._position = None
+        self._pending_clicks = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="cursor-actuator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running.clear()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def move_to(self, x, y):
+        with self._lock:
+            self._target = (float(x), float(y))
+        self._wake.set()
+
+    def click(self):
+        with self._lock:
+            self._pending_clicks += 1
+        self._wake.set()
+
+    def reset(self):
+        # Forget the current position, the next target is jumped to directly
+        with self._lock:
+            self._target = None
+            self._position = None
+
+    def stats(self):
+        return {
+            'backend': self.backend.name,
+            'moves': self.moves,
+            'clicks': self.clicks,
+            'errors': self.errors,
+        }
+
+    def _step(self):
+        # One interpolation step, returns False once the cursor reached the target
+        with self._lock:
+            target = self._target
+            clicks, self._pending_clicks = self._pending_clicks, 0
+            if target is None:
+                moving = False
+            elif self._position is None:
+                self._position = target
+                moving = True
+            else:
+                x, y = self._position
+                dx, dy = target[0] - x, target[1] - y
+                if abs(dx) >= self.min_step or abs(dy) >= self.min_step:
+                    self._position = (x + dx * self.smoothing, y + dy * self.smoothing)
+                    moving = True
+                else:
+                    # Close enough, snap onto the target
+                    moving = self._position != target
+                    self._position = target
+            position = self._position
+
+        try:
+            if moving:
+                with tracer.span('cursor.move', 'actuator'):
+                    self.backend.move(round(position[0]), round(position[1]))
+                self.moves += 1
+            # Click where the cursor is now
+            for _ in range(clicks):
+                self.backend.click()
+                self.clicks += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Mouse control error: {e}")
+        return moving
+
+    def _run(self):
+        interval = 1.0 / self.rate
+        while self._running.is_set():
+            if self._step():
+                time.sleep(interval)
+            else:
+                # Idle until there is a new target or click
+                self._wake.wait()
+                self._wake.clear()
@@ -0,0 +1,111 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Backend:
+    def __init__(self, name, factory, close=None, warm=None):
+        self.name = name
+        self.factory = factory
+        self.close = close
+        self.warm = warm  # None, 'thread' or 'main'
+        self.instance = None
+        self.loaded = False
+        self.error = None
+        self.load_time = None
+        self.lock = threading.Lock()
+
+
+class BackendRegistry:
+    # Integrations are registered with a factory and only created on first use,
+    # or during warm-up once the window is up. Backends nobody asks for are never
+    # imported. Load times end up in report() next to the timed startup steps.
+    def __init__(self):
+        self._backends = {}
+        self._startup = []
+        self._warm_thread = None
+
+    def register(self, name, factory, close=None, warm=None):
+        # warm='thread' loads on a background thread after startup, warm='main'
+        # on the GUI thread (for anything touching Qt or COM), None only on use
+        self._backends[name] = Backend(name, factory, close, warm)
+
+    def get(self, name):
+        # Returns the instance, or None if it failed to load
+        backend = self._backends[name]
+        if backend.loaded:
+            return backend.instance
+        with backend.lock:
+            if not backend.loaded:
+                start = time.perf_counter()
+                try:
+                    backend.instance = backend.factory()
+                except Exception as e:
+                    backend.error = str(e)
+                    print(f"Could not load {name}: {e}")
+                backend.load_time = time.perf_counter() - start
+                backend.loaded = True
+        return backend.instance
+
+    def loaded(self, name):
+        backend = self._backends[name]
+        return backend.loaded and backend.instance is not None
+
+    def pending_warm_up(self, mode):
+        return [backend.name for backend in self._backends.values()
+                if backend.warm == mode and not backend.loaded]
+
+    def warm_up_in_background(self, on_done=None):
+        names = self.pending_warm_up('thread')
+        if not names or self._warm_thread is not None:
+            return
+
+        def warm():
+            for name in names:
+                self.get(name)
+            if on_done is not None:
+                on_done()
+
+        self._warm_thread = threading.Thread(target=warm, name="backend-warm-up", daemon=True)
+        self._warm_thread.start()
+
+    @contextmanager
+    def timed(self, name):
+        # Times an eager startup step for the report
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._startup.append((name, time.perf_counter() - start))
+
+    def report(self):
+        rows = [{'name': name, 'kind': 'startup', 'seconds': seconds, 'status': 'ok'}
+                for name, seconds in self._startup]
+        for backend in self._backends.values():
+            if not backend.loaded:
+                status = 'not loaded'
+            elif backend.error:
+                status = f"failed: {backend.error}"
+            else:
+                status = 'ok'
+            rows.append({
+                'name': backend.name,
+                'kind': f"lazy ({backend.warm})" if backend.warm else 'lazy',
+                'seconds': backend.load_time,
+                'status': status,
+            })
+        return rows
+
+    def print_report(self):
+        print("Startup report:")
+        for row in self.report():
+            seconds = f"{row['seconds'] * 1000:8.1f} ms" if row['seconds'] is not None else "       -   "
+            print(f"  {row['name']:20} {row['kind']:15} {seconds}  {row['status']}")
+
+    def close(self):
+        for backend in self._backends.values():
+            if backend.loaded and backend.instance is not None and backend.close is not None:
+                try:
+                    backend.close(backend.instance)
+                except Exception as e:
+                    print(f"Error closing {backend.name}: {e}")
@@ -0,0 +1,184 @@
+"""Memory churn of the frame loop with and without the frame buffer pool.
+
+Runs capture, mirror, preview scaling and the RGB conversion of the inference
+worker the way the app does, once allocating a new array at every stage and
+once with pooled buffers (cap.read(image=...), dst=...). Reports time per
+frame, traced peak memory, the bytes allocated per frame and the frame-sized
+arrays allocated per frame. Without --video a synthetic clip is written to a
+temporary file first, so capture goes through a real cv2.VideoCapture.
+
+    python -m benchmarks.frame_buffers --video recording.mp4 --output buffers.json
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from frames import FramePool
+
+
+def write_synthetic(path, width, height, frames=60, fps=30):
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+
+
+class LoopingCapture:
+    def __init__(self, path):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise Exception(f"Could not open {path}")
+
+    def read(self, image=None):
+        ret, frame = self.cap.read(image)
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image)
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+def allocating_step(cap, view_size, state):
+    # What update_frame and the worker did before the pool: a new array per stage
+    ret, frame = cap.read()
+    mirrored = cv2.flip(frame, 1)
+    cv2.cvtColor(mirrored, cv2.COLOR_BGR2RGB)  # the worker's copy, only allocated here
+    preview = cv2.resize(mirrored, view_size, interpolation=cv2.INTER_AREA)
+    state['arrays'] += 4
+    state['shown'] = preview  # the view keeps the shown frame alive
+
+
+def pooled_step(cap, view_size, state):
+    pool = state['pool']
+    shape = state.get('shape')
+    raw = pool.acquire(shape) if shape else None
+    ret, frame = cap.read(raw.array if raw is not None else None)
+    if raw is None or frame is not raw.array:
+        if raw is not None:
+            raw.release()
+        raw = pool.adopt(frame)
+        state['shape'] = frame.shape
+
+    mirrored = pool.acquire(frame.shape)
+    cv2.flip(raw.array, 1, dst=mirrored.array)
+    raw.release()
+
+    # The worker's reused RGB buffer
+    if state.get('rgb') is None or state['rgb'].shape != frame.shape:
+        state['rgb'] = np.empty(frame.shape, dtype=np.uint8)
+    cv2.cvtColor(mirrored.array, cv2.COLOR_BGR2RGB, dst=state['rgb'])
+
+    preview = pool.acquire((view_size[1], view_size[0], 3))
+    cv2.resize(mirrored.array, view_size, dst=preview.array, interpolation=cv2.INTER_AREA)
+    mirrored.release()
+    if state.get('shown') is not None:
+        state['shown'].release()
+    state['shown'] = preview
+
+
+def run(step, source, frames, warmup, view_size, state):
+    cap = LoopingCapture(source)
+    try:
+        for _ in range(warmup):
+            step(cap, view_size, state)
+        state['arrays'] = 0
+        if 'pool' in state:
+            state['allocated_before'] = state['pool'].allocated
+
+        gc.collect()
+        collections = sum(stats['collections'] for stats in gc.get_stats())
+        tracemalloc.start()
+        per_frame = []
+        timings = []
+        for _ in range(frames):
+            start_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            start = time.perf_counter()
+            step(cap, view_size, state)
+            timings.append(time.perf_counter() - start)
+            per_frame.append(tracemalloc.get_traced_memory()[1] - start_memory)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        collections = sum(stats['collections'] for stats in gc.get_stats()) - collections
+    finally:
+        cap.release()
+
+    if 'pool' in state:
+        arrays = state['pool'].allocated - state['allocated_before']
+    else:
+        arrays = state['arrays']
+    timings = np.array(timings) * 1000
+    return {
+        'frames': frames,
+        'mean_ms': float(timings.mean()),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'peak_traced_bytes': int(peak),
+        'bytes_allocated_per_frame': float(np.mean(per_frame)),
+        'frame_arrays_per_frame': arrays / frames,
+        'gc_collections': collections,
+    }
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--video', help="Recorded footage, a synthetic clip otherwise")
+    parser.add_argument('--resolution', default='1280x720', help="Synthetic clip size")
+    parser.add_argument('--view-size', default='960x540', help="Preview size")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--output', help="Write the report as JSON")
+    args = parser.parse_args()
+
+    view_size = parse_size(args.view_size)
+    temp_dir = None
+    source = args.video
+    if source is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        source = os.path.join(temp_dir.name, 'synthetic.avi')
+        write_synthetic(source, *parse_size(args.resolution))
+
+    try:
+        report = {
+            'source': args.video or f"synthetic {args.resolution}",
+            'view_size': list(view_size),
+            'allocating': run(allocating_step, source, args.frames, args.warmup, view_size,
+                              {'arrays': 0}),
+            'pooled': run(pooled_step, source, args.frames, args.warmup, view_size,
+                          {'arrays': 0, 'pool': FramePool()}),
+        }
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    print(f"{'':12}{'mean ms':>10}{'p95 ms':>10}{'peak MB':>10}{'KB/frame':>10}{'arrays':>8}")
+    for name in ('allocating', 'pooled'):
+        stats = report[name]
+        print(f"{name:12}{stats['mean_ms']:10.2f}{stats['p95_ms']:10.2f}"
+              f"{stats['peak_traced_bytes'] / 1e6:10.2f}"
+              f"{stats['bytes_allocated_per_frame'] / 1e3:10.1f}"
+              f"{stats['frame_arrays_per_frame']:8.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
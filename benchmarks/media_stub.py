@@ -0,0 +1,110 @@
+"""Local stand-in for the Spotify API, and a burst test of MediaDispatcher
+against it.
+
+    python -m benchmarks.media_stub --serve --port 8765
+    MEDIA_STUB_URL=http://127.0.0.1:8765 python main.py
+
+Without --serve, bursts of gestures are submitted to a MediaDispatcher with an
+HttpMediaBackend pointed at the stub, and the dispatcher stats and the
+commands that reached the server are printed.
+
+    python -m benchmarks.media_stub --bursts 20 --rate-limit-every 5
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from media import HttpMediaBackend, MediaDispatcher
+
+
+class StubMediaServer:
+    # Local stand-in for the Spotify API. Records every command it receives and
+    # can answer with 429 to exercise the rate limit handling.
+    def __init__(self, host='127.0.0.1', port=0, rate_limit_every=0):
+        self.commands = []
+        self.rate_limit_every = rate_limit_every
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                requests_seen = len(server.commands) + 1
+                if server.rate_limit_every and requests_seen % server.rate_limit_every == 0:
+                    server.commands.append(None)
+                    self.send_response(429)
+                    self.send_header('Retry-After', '0.1')
+                    self.end_headers()
+                    return
+                server.commands.append(self.path.strip('/'))
+                body = json.dumps({'ok': True}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="media-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--serve', action='store_true', help="Only run the stub server")
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--rate-limit-every', type=int, default=0,
+                        help="Answer every n-th request with 429")
+    parser.add_argument('--bursts', type=int, default=10)
+    parser.add_argument('--output', help="Write the report as JSON")
+    args = parser.parse_args()
+
+    server = StubMediaServer(port=args.port, rate_limit_every=args.rate_limit_every).start()
+    try:
+        if args.serve:
+            print(f"Media stub on {server.url}, Ctrl+C to stop")
+            while True:
+                time.sleep(1)
+
+        dispatcher = MediaDispatcher(HttpMediaBackend(server.url))
+        dispatcher.start()
+        start = time.perf_counter()
+        for _ in range(args.bursts):
+            # A flickering gesture: several next/play_pause within a few frames
+            for command in ('next', 'next', 'next', 'pause', 'play'):
+                dispatcher.submit(command)
+                time.sleep(0.02)
+            time.sleep(0.5)
+        dispatcher.stop(timeout=10.0)
+
+        report = {
+            'elapsed_s': time.perf_counter() - start,
+            'dispatcher': dispatcher.stats(),
+            'received': [command for command in server.commands if command is not None],
+            'rate_limited': server.commands.count(None),
+        }
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
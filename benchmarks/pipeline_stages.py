@@ -0,0 +1,276 @@
+"""Per-stage latency of the update_frame pipeline.
+
+Times the stages the app runs for every frame, one by one: the pooled capture
+read (cap.read(image=...) into a FramePool buffer), the flip into a pooled
+buffer, the copy into the inference worker's slot, the worker's cvtColor and
+Hands.process, the OverlayRenderer drawing on the copy scaled to the preview
+and the CameraView painting that BGR888 frame scaled with QPainter. Runs on
+synthetic frames and optionally on recorded footage, at several resolutions.
+Reports p50/p95/p99 per stage and writes a JSON file that can be compared
+between releases.
+
+    python -m benchmarks.pipeline_stages --video recording.mp4 --output stages.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import mediapipe as mp
+from PyQt5.QtGui import QImage
+from PyQt5.QtWidgets import QApplication
+
+from display import CameraView
+from frames import FramePool
+from inference import DEFAULT_HANDS_CONFIG, HandDetector
+from overlay import OverlayRenderer
+
+STAGES = ['capture', 'flip', 'submit_copy', 'cvtColor', 'hands_process',
+          'overlay_renderer', 'paint', 'total']
+
+BANNERS = [("Virtual Keyboard Active", (10, 30)),
+           ("Mouse Control Active", (10, 60)),
+           ("Exercise Mode Active", (10, 90))]
+
+
+def synthetic_hands():
+    # Two open hands so the overlay has something to draw on every frame
+    rng = np.random.default_rng(0)
+    hands = np.empty((2, 21, 3), dtype=np.float32)
+    for i, center in enumerate((0.3, 0.7)):
+        hands[i, :, 0] = center + rng.uniform(-0.1, 0.1, 21)
+        hands[i, :, 1] = 0.5 + rng.uniform(-0.2, 0.2, 21)
+        hands[i, :, 2] = rng.uniform(-0.05, 0.05, 21)
+    return hands
+
+
+class SyntheticSource:
+    # A few pre-generated noise frames, "capture" is copying one out
+    def __init__(self, width, height, count=8):
+        rng = np.random.default_rng(0)
+        self.frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+                       for _ in range(count)]
+        self.index = 0
+
+    def read(self, image=None):
+        # Like cv2.VideoCapture.read: fills image when it fits, allocates otherwise
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        if image is None or image.shape != frame.shape:
+            return True, frame.copy()
+        np.copyto(image, frame)
+        return True, image
+
+    def release(self):
+        pass
+
+
+class VideoSource:
+    # Recorded footage resized to the requested resolution, looping at the end
+    def __init__(self, path, width, height):
+        self.path = path
+        self.size = (width, height)
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise Exception(f"Could not open {path}")
+
+    def read(self, image=None):
+        if image is not None and image.shape[1::-1] != self.size:
+            image = None
+        ret, frame = self.cap.read(image)
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image)
+        if ret and frame.shape[1::-1] != self.size:
+            frame = cv2.resize(frame, self.size, dst=image)
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+def pooled_read(source, pool, shape):
+    # CameraCapture._decode: read into a pooled buffer, adopting the array
+    # the source allocated when the size didn't match
+    buffer = pool.acquire(shape) if shape is not None else None
+    ret, frame = source.read(buffer.array if buffer is not None else None)
+    if not ret or frame is None:
+        if buffer is not None:
+            buffer.release()
+        return None
+    if buffer is None or frame is not buffer.array:
+        if buffer is not None:
+            buffer.release()
+        buffer = pool.adopt(frame)
+    return buffer
+
+
+def run(source, frames, view_size, detector, fallback_hands):
+    samples = defaultdict(list)
+    pool = FramePool()
+    overlays = OverlayRenderer()
+    view = CameraView(preview_fps=0)
+    view.resize(*view_size)
+    canvas = QImage(view.width(), view.height(), QImage.Format_RGB32)
+    shape = None
+    slot = None  # the worker's shared memory slot
+    rgb = None
+    shown = None  # the view paints from the buffer until the next frame
+
+    def record(stage, start):
+        now = time.perf_counter()
+        samples[stage].append(now - start)
+        return now
+
+    try:
+        for _ in range(frames):
+            frame_start = t = time.perf_counter()
+            raw = pooled_read(source, pool, shape)
+            if raw is None:
+                break
+            shape = raw.shape
+            t = record('capture', t)
+
+            frame = pool.acquire(raw.shape)
+            cv2.flip(raw.array, 1, dst=frame.array)
+            raw.release()
+            t = record('flip', t)
+
+            if slot is None or slot.shape != frame.shape:
+                slot = np.empty(frame.shape, dtype=np.uint8)
+                rgb = np.empty(frame.shape, dtype=np.uint8)
+            np.copyto(slot, frame.array)
+            t = record('submit_copy', t)
+
+            # The next two run in the inference process, off the GUI thread
+            cv2.cvtColor(slot, cv2.COLOR_BGR2RGB, dst=rgb)
+            t = record('cvtColor', t)
+
+            landmarks, _ = detector.detect(rgb)
+            t = record('hands_process', t)
+            hands = landmarks if len(landmarks) else fallback_hands
+
+            # draw_overlays in 'preview' mode
+            height, width = frame.shape[:2]
+            size = view.display_size(width, height)
+            if size[0] < width and size[1] < height:
+                scaled = pool.acquire((size[1], size[0], 3))
+                overlays.render(frame.array, hands, BANNERS, size, out=scaled.array)
+                frame.release()
+                frame = scaled
+            else:
+                overlays.render(frame.array, hands, BANNERS)
+            t = record('overlay_renderer', t)
+
+            # BGR888 QImage over the buffer, scaled while painting
+            view.show_frame(frame.array)
+            view.render(canvas)
+            if shown is not None:
+                shown.release()
+            shown = frame
+            t = record('paint', t)
+
+            samples['total'].append(t - frame_start)
+    finally:
+        view.clear()
+        if shown is not None:
+            shown.release()
+    return samples
+
+
+def summarize(samples):
+    report = {}
+    for stage in STAGES:
+        values = np.array(samples.get(stage, [])) * 1000
+        if not len(values):
+            continue
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        mean = float(values.mean())
+        report[stage] = {
+            'samples': int(len(values)),
+            'mean_ms': mean,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'fps': 1000 / mean if mean else None,
+        }
+    return report
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def print_report(name, resolution, report):
+    print(f"\n{name} {resolution[0]}x{resolution[1]}")
+    print(f"{'stage':20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fps':>10}")
+    for stage, stats in report.items():
+        print(f"{stage:20}{stats['p50_ms']:10.2f}{stats['p95_ms']:10.2f}"
+              f"{stats['p99_ms']:10.2f}{stats['fps']:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency of the frame pipeline")
+    parser.add_argument('--video', action='append', default=[], help="Recorded footage")
+    parser.add_argument('--resolutions', default='640x480,1280x720,1920x1080')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--view-size', default='960x720', help="Size of the preview label")
+    parser.add_argument('--output', default='pipeline_stages.json')
+    args = parser.parse_args()
+
+    # QPainter needs the application object, the reference keeps it alive
+    app = QApplication.instance() or QApplication(sys.argv)  # noqa: F841
+    view_size = parse_size(args.view_size)
+    fallback_hands = synthetic_hands()
+
+    results = []
+    for resolution in map(parse_size, args.resolutions.split(',')):
+        sources = [('synthetic', lambda: SyntheticSource(*resolution))]
+        sources += [(path, lambda path=path: VideoSource(path, *resolution))
+                    for path in args.video]
+
+        for name, make_source in sources:
+            source = make_source()
+            detector = HandDetector(DEFAULT_HANDS_CONFIG)
+            try:
+                run(source, args.warmup, view_size, detector, fallback_hands)
+                report = summarize(run(source, args.frames, view_size, detector,
+                                       fallback_hands))
+            finally:
+                detector.close()
+                source.release()
+
+            print_report(name, resolution, report)
+            results.append({
+                'source': name,
+                'resolution': list(resolution),
+                'stages': report,
+            })
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'mediapipe': getattr(mp, '__version__', None),
+            'frames': args.frames,
+            'view_size': list(view_size),
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
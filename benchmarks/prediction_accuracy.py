@@ -0,0 +1,147 @@
+"""Accuracy of predictive landmark tracking on recorded footage.
+
+Every frame is run through a full HandDetector for ground truth. The
+LandmarkPredictor then replays the sequence, seeing the ground truth only on
+the frames it asks inference for (optionally latency_frames later, like the
+worker process), and predicting the rest. The report compares the landmarks
+and the gesture events both sequences produce.
+
+    python -m benchmarks.prediction_accuracy recording.mp4 --output prediction.json
+"""
+import argparse
+import json
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.roi_inference import load_frames
+from inference import DEFAULT_HANDS_CONFIG, HandDetector
+from landmarks import empty_hands
+from pipeline import EventLog, GesturePipeline
+from tracking import LandmarkPredictor
+
+
+def ground_truth(frames):
+    detector = HandDetector(DEFAULT_HANDS_CONFIG)
+    try:
+        return [detector.detect(frame) for frame in frames]
+    finally:
+        detector.close()
+
+
+def simulate(truth, fps, interval, max_speed, max_error, latency_frames):
+    predictor = LandmarkPredictor(interval=interval, max_speed=max_speed, max_error=max_error,
+                                  max_hands=DEFAULT_HANDS_CONFIG['max_num_hands'])
+    pending = []  # (arrives at frame, frame index)
+    outputs = []
+    for index in range(len(truth)):
+        timestamp = index / fps
+        while pending and pending[0][0] <= index:
+            _, source = pending.pop(0)
+            landmarks, handedness = truth[source]
+            predictor.update(landmarks, handedness, source / fps)
+        if predictor.should_infer():
+            predictor.mark_inferred()
+            if latency_frames:
+                pending.append((index + latency_frames, index))
+            else:
+                predictor.update(*truth[index], timestamp)
+        if predictor.ready:
+            outputs.append(predictor.predict(timestamp)[0])
+        else:
+            outputs.append(empty_hands()[0])
+    return outputs, predictor.stats()
+
+
+def landmark_errors(reference, candidate):
+    # Per-frame mean normalised xy distance, frames where the hand counts
+    # disagree are counted separately
+    errors = []
+    mismatched = 0
+    for ref, cand in zip(reference, candidate):
+        if len(ref) != len(cand):
+            mismatched += 1
+        elif len(ref):
+            ref = ref[np.argsort(ref[:, 0, 0])]
+            cand = cand[np.argsort(cand[:, 0, 0])]
+            errors.append(float(np.linalg.norm(ref[:, :, :2] - cand[:, :, :2], axis=-1).mean()))
+    return {
+        'mean_landmark_error': float(np.mean(errors)) if errors else None,
+        'p95_landmark_error': float(np.percentile(errors, 95)) if errors else None,
+        'hand_count_mismatches': mismatched,
+    }
+
+
+def gesture_events(sequence, fps, modes):
+    events = EventLog()
+    gestures = GesturePipeline(events)
+    gestures.virtual_keyboard_active = 'keyboard' in modes
+    gestures.mouse_control_active = 'mouse' in modes
+    gestures.exercise_mode_active = 'exercise' in modes
+    for index, hands in enumerate(sequence):
+        events.timestamp = index / fps
+        events.frame_index = index
+        gestures.process(hands, index / fps)
+    return Counter(event['action'] for event in events.events
+                   if event['action'] not in ('gesture', 'sound'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('video', help="Recorded video file")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--interval', type=int, default=2)
+    parser.add_argument('--max-speed', type=float, default=1.5)
+    parser.add_argument('--max-error', type=float, default=0.03)
+    parser.add_argument('--latency-frames', type=int, default=0)
+    parser.add_argument('--mode', action='append', default=[],
+                        choices=['keyboard', 'mouse', 'exercise'])
+    parser.add_argument('--output', help="Write the report as JSON")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames could be read from {args.video}")
+
+    truth = ground_truth(frames)
+    predicted, stats = simulate(truth, args.fps, args.interval, args.max_speed,
+                                args.max_error, args.latency_frames)
+    reference = [landmarks for landmarks, _ in truth]
+
+    truth_events = gesture_events(reference, args.fps, args.mode)
+    predicted_events = gesture_events(predicted, args.fps, args.mode)
+    matched = sum((truth_events & predicted_events).values())
+    total = max(sum(truth_events.values()), sum(predicted_events.values()))
+
+    report = {
+        'video': args.video,
+        'frames': len(frames),
+        'settings': {
+            'interval': args.interval,
+            'max_speed': args.max_speed,
+            'max_error': args.max_error,
+            'latency_frames': args.latency_frames,
+        },
+        'inference_fraction': stats['inferred'] / len(frames),
+        'forced_inferences': stats['forced'],
+        'accuracy': landmark_errors(reference, predicted),
+        'events': {
+            'ground_truth': dict(truth_events),
+            'predicted': dict(predicted_events),
+            'agreement': matched / total if total else 1.0,
+        },
+    }
+
+    print(f"Inference on {report['inference_fraction'] * 100:.1f}% of frames "
+          f"({stats['forced']} forced by motion or error)")
+    print(f"Accuracy: {report['accuracy']}")
+    print(f"Gesture events: {report['events']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
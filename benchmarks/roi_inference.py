@@ -0,0 +1,116 @@
+"""Before/after comparison of full-frame and ROI-cropped hand inference on
+recorded footage.
+
+    python -m benchmarks.roi_inference recording.mp4 --output roi.json
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from inference import DEFAULT_HANDS_CONFIG, AdaptiveHandDetector, HandDetector
+
+
+def load_frames(path, max_frames):
+    frames = []
+    cap = cv2.VideoCapture(path)
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        # Same preprocessing as the app
+        frame = cv2.flip(frame, 1)
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    return frames
+
+
+def run_detector(detector, frames):
+    timings = []
+    outputs = []
+    cpu_start = time.process_time()
+    for frame in frames:
+        start = time.perf_counter()
+        landmarks, _ = detector.detect(frame)
+        timings.append(time.perf_counter() - start)
+        outputs.append(landmarks)
+    cpu_time = time.process_time() - cpu_start
+    detector.close()
+
+    timings = np.array(timings) * 1000
+    return outputs, {
+        'frames': len(frames),
+        'mean_ms': float(timings.mean()),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'cpu_ms_per_frame': cpu_time * 1000 / len(frames),
+        'frames_with_hands': sum(1 for landmarks in outputs if len(landmarks)),
+    }
+
+
+def landmark_error(reference, candidate):
+    # Mean normalised distance between matching landmarks, frames where the
+    # hand counts disagree are counted separately
+    errors = []
+    mismatched = 0
+    for ref, cand in zip(reference, candidate):
+        if len(ref) != len(cand):
+            mismatched += 1
+            continue
+        if len(ref):
+            # Pair hands by wrist position so order differences don't count
+            ref = ref[np.argsort(ref[:, 0, 0])]
+            cand = cand[np.argsort(cand[:, 0, 0])]
+            errors.append(float(np.linalg.norm(ref[:, :, :2] - cand[:, :, :2], axis=-1).mean()))
+    return {
+        'mean_landmark_error': float(np.mean(errors)) if errors else None,
+        'hand_count_mismatches': mismatched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('video', help="Recorded video file")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--margin', type=float, default=0.3)
+    parser.add_argument('--roi-size', type=int, default=256)
+    parser.add_argument('--scale', type=float, default=0.5)
+    parser.add_argument('--output', help="Write the report as JSON")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames could be read from {args.video}")
+
+    full_outputs, full_stats = run_detector(HandDetector(DEFAULT_HANDS_CONFIG), frames)
+    adaptive = AdaptiveHandDetector(DEFAULT_HANDS_CONFIG, margin=args.margin,
+                                    roi_size=args.roi_size, detection_scale=args.scale)
+    adaptive_outputs, adaptive_stats = run_detector(adaptive, frames)
+    adaptive_stats.update(roi_frames=adaptive.roi_frames, full_frames=adaptive.full_frames)
+
+    report = {
+        'video': args.video,
+        'resolution': list(frames[0].shape[1::-1]),
+        'full_frame': full_stats,
+        'adaptive': adaptive_stats,
+        'cpu_reduction': 1 - adaptive_stats['cpu_ms_per_frame'] / full_stats['cpu_ms_per_frame'],
+        'accuracy': landmark_error(full_outputs, adaptive_outputs),
+    }
+
+    print(f"{'':12}{'mean ms':>10}{'p95 ms':>10}{'cpu ms':>10}{'hands':>8}")
+    for name in ('full_frame', 'adaptive'):
+        stats = report[name]
+        print(f"{name:12}{stats['mean_ms']:10.2f}{stats['p95_ms']:10.2f}"
+              f"{stats['cpu_ms_per_frame']:10.2f}{stats['frames_with_hands']:8d}")
+    print(f"CPU reduction: {report['cpu_reduction'] * 100:.1f}%")
+    print(f"Accuracy: {report['accuracy']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
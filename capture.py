@@ -0,0 +1,205 @@
+import sys
+import threading
+import time
+import cv2
+
+from frames import FramePool
+from tracing import tracer
+
+
+def default_api_preference():
+    # DirectShow on Windows, whatever OpenCV picks elsewhere
+    return cv2.CAP_DSHOW if sys.platform == 'win32' else cv2.CAP_ANY
+
+
+class FrameRingBuffer:
+    # Small ring buffer that only ever hands out the newest frame.
+    # Frames that are overwritten before anybody reads them count as dropped.
+    # Frames are FrameBuffers: put() takes over the caller's reference, which is
+    # released once the slot is overwritten, and get_latest() hands out a new one.
+    def __init__(self, capacity=2):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._write_index = 0
+        self._sequence = 0
+        self._read_sequence = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+
+    def put(self, frame, timestamp):
+        with self._lock:
+            # The previous newest frame was never picked up
+            if self._sequence > self._read_sequence:
+                self.dropped += 1
+            self._sequence += 1
+            old = self._slots[self._write_index]
+            self._slots[self._write_index] = (self._sequence, timestamp, frame)
+            self._write_index = (self._write_index + 1) % self.capacity
+            self._new_frame.notify_all()
+        if old is not None:
+            old[2].release()
+
+    def get_latest(self, timeout=0, max_age=None):
+        # Returns (sequence, timestamp, frame) or None when nothing new arrived.
+        # timeout=0 never blocks, timeout=None waits until a frame shows up.
+        with self._lock:
+            if self._sequence == self._read_sequence and timeout != 0:
+                self._new_frame.wait_for(
+                    lambda: self._sequence > self._read_sequence, timeout)
+            if self._sequence == self._read_sequence:
+                return None
+
+            newest = self._slots[(self._write_index - 1) % self.capacity]
+            self._read_sequence = self._sequence
+
+            # Too old to act on, bound the capture-to-action latency
+            if max_age is not None and time.perf_counter() - newest[1] > max_age:
+                self.dropped += 1
+                return None
+            sequence, timestamp, frame = newest
+            return sequence, timestamp, frame.retain()
+
+    def clear(self):
+        with self._lock:
+            slots = self._slots
+            self._slots = [None] * self.capacity
+            self._read_sequence = self._sequence
+        for slot in slots:
+            if slot is not None:
+                slot[2].release()
+
+
+class CameraCapture:
+    # Owns the cv2.VideoCapture on a dedicated thread and keeps only the newest frame.
+    # fps_limit caps the frames handed on, the others are grabbed but never decoded.
+    # Frames are decoded straight into buffers from pool; read_latest() returns
+    # a FrameBuffer the caller has to release.
+    def __init__(self, index, width=640, height=480, fps=30,
+                 api_preference=cv2.CAP_DSHOW, buffer_size=2,
+                 max_frame_age=0.2, max_failures=30, fps_limit=None, pool=None):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fps_limit = fps_limit
+        self.api_preference = api_preference
+        self.max_frame_age = max_frame_age
+        self.max_failures = max_failures
+        self.buffer = FrameRingBuffer(buffer_size)
+        self.pool = pool if pool is not None else FramePool()
+
+        self.frames_captured = 0
+        self.frames_governed = 0
+        self.error = None
+
+        self._cap = None
+        self._thread = None
+        self._running = threading.Event()
+
+    def open(self):
+        self._cap = cv2.VideoCapture(self.index, self.api_preference)
+        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self._cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # Don't let frames queue up in the driver
+        self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        if not self._cap.isOpened():
+            self._cap.release()
+            self._cap = None
+            raise Exception("Could not open camera!")
+
+    def start(self):
+        if self._cap is None:
+            self.open()
+        self.error = None
+        self._running.set()
+        self._thread = threading.Thread(
+            target=self._run, name=f"camera-capture-{self.index}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.buffer.clear()
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    @property
+    def frames_dropped(self):
+        return self.buffer.dropped
+
+    def read_latest(self, timeout=0):
+        return self.buffer.get_latest(timeout, self.max_frame_age)
+
+    def _run(self):
+        cap = self._cap
+        failures = 0
+        next_due = 0.0
+        shape = None  # known after the first frame
+        try:
+            while self._running.is_set():
+                if self.fps_limit:
+                    # Frames ahead of schedule are grabbed but not decoded. A
+                    # quarter interval of slack absorbs camera timing jitter.
+                    interval = 1.0 / self.fps_limit
+                    with tracer.span('capture.grab', 'capture'):
+                        grabbed = cap.grab()
+                    if not grabbed:
+                        ret, buffer = False, None
+                    elif time.perf_counter() < next_due - interval / 4:
+                        self.frames_governed += 1
+                        continue
+                    else:
+                        with tracer.span('capture.retrieve', 'capture'):
+                            ret, buffer = self._decode(cap.retrieve, shape)
+                        now = time.perf_counter()
+                        next_due += interval
+                        if next_due < now:
+                            # More than a frame behind, restart the schedule
+                            next_due = now + interval
+                else:
+                    with tracer.span('capture.read', 'capture'):
+                        ret, buffer = self._decode(cap.read, shape)
+                if not ret:
+                    failures += 1
+                    if failures >= self.max_failures:
+                        self.error = "Could not capture frame!"
+                        break
+                    time.sleep(0.01)
+                    continue
+
+                failures = 0
+                shape = buffer.shape
+                self.frames_captured += 1
+                self.buffer.put(buffer, time.perf_counter())
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self._running.clear()
+            # Release from the owning thread so a pending read never races it
+            cap.release()
+            self._cap = None
+
+    def _decode(self, read, shape):
+        # read is cap.read or cap.retrieve, decoding into a pooled buffer. OpenCV
+        # allocates a new array when the size doesn't match, that one is adopted.
+        buffer = self.pool.acquire(shape) if shape is not None else None
+        image = buffer.array if buffer is not None else None
+        ret, frame = read(image)
+        if not ret or frame is None:
+            if buffer is not None:
+                buffer.release()
+            return False, None
+        if frame is not image:
+            if buffer is not None:
+                buffer.release()
+            buffer = self.pool.adopt(frame)
+        return True, buffer
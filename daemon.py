@@ -0,0 +1,512 @@
+"""Headless gesture service that streams results to other processes.
+
+Runs capture, inference and the gesture pipeline without Qt and publishes
+the results over a local socket, so several consumers can share one camera
+and one inference process:
+
+    python daemon.py --camera 0 --address /tmp/clapathon.sock
+    python daemon.py --source recording.mp4 --address 127.0.0.1:8765
+    python daemon.py --listen --address /tmp/clapathon.sock --topic events --topic landmarks
+
+Every message is a 5 byte header (topic id, payload length) followed by the
+payload. Gesture actions of one frame arrive batched as one JSON array,
+landmark frames as packed binary (see pack_landmarks). Clients pick their
+topics by sending JSON lines such as {"subscribe": ["landmarks"]}.
+"""
+import argparse
+import json
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from capture import CameraCapture, default_api_preference
+from inference import InferenceWorker
+from landmarks import NUM_LANDMARKS
+from pipeline import EventLog, GesturePipeline
+from replay import iter_frames, load_profile
+
+TOPICS = {'events': 1, 'landmarks': 2, 'stats': 3}
+TOPIC_NAMES = {topic_id: name for name, topic_id in TOPICS.items()}
+DEFAULT_TOPICS = ('events',)
+
+HEADER = struct.Struct('<BI')  # topic id, payload length
+LANDMARK_HEADER = struct.Struct('<IdB')  # frame id, capture time, hand count
+
+
+def default_address():
+    # Unix sockets where available, loopback TCP on Windows
+    return '/tmp/clapathon.sock' if hasattr(socket, 'AF_UNIX') else '127.0.0.1:8765'
+
+
+def parse_address(address):
+    # 'host:port' is TCP, anything else a Unix socket path
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    return socket.AF_UNIX, address
+
+
+def pack_landmarks(result):
+    # frame id, capture time, hand count, handedness (int8 each), then the
+    # float32 landmarks, 21 x 3 per hand
+    count = len(result.landmarks)
+    return b''.join((
+        LANDMARK_HEADER.pack(result.frame_id & 0xFFFFFFFF, result.captured_at, count),
+        result.handedness.astype(np.int8).tobytes(),
+        result.landmarks.astype(np.float32).tobytes()))
+
+
+def unpack_landmarks(payload):
+    frame_id, captured_at, count = LANDMARK_HEADER.unpack_from(payload)
+    offset = LANDMARK_HEADER.size
+    handedness = np.frombuffer(payload, dtype=np.int8, count=count, offset=offset)
+    landmarks = np.frombuffer(payload, dtype=np.float32, count=count * NUM_LANDMARKS * 3,
+                              offset=offset + count).reshape(count, NUM_LANDMARKS, 3)
+    return {
+        'frame_id': frame_id,
+        'captured_at': captured_at,
+        'handedness': handedness,
+        'landmarks': landmarks,
+    }
+
+
+class _Client:
+    def __init__(self, sock):
+        self.sock = sock
+        self.topics = set(DEFAULT_TOPICS)
+        self.inbox = b''
+        self.outbox = deque()
+        self.queued = 0
+        self.dropped = 0
+
+
+class StreamServer:
+    # Publishes messages to every connected client subscribed to their topic.
+    # Sockets are served from one selector thread; publish() only queues. A
+    # client that falls more than max_queued bytes behind misses messages
+    # rather than slowing down the pipeline.
+    def __init__(self, address=None, max_queued=1 << 20):
+        self.address = address or default_address()
+        self.max_queued = max_queued
+
+        self.published = 0
+        self.dropped = 0
+
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._listener = None
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        family, address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.unlink(address)  # Left over from a previous run
+        self._listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(address)
+        self._listener.listen()
+        self._listener.setblocking(False)
+        self._selector.register(self._listener, selectors.EVENT_READ)
+
+        # Lets publish() wake the selector when there is something to send
+        self._wake_read, self._wake_write = socket.socketpair()
+        self._wake_read.setblocking(False)
+        self._wake_write.setblocking(False)
+        self._selector.register(self._wake_read, selectors.EVENT_READ)
+
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="stream-server", daemon=True)
+        self._thread.start()
+        print(f"Streaming on {self.address}")
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._wake()
+            self._thread.join(2.0)
+            self._thread = None
+        for client in list(self._clients.values()):
+            self._disconnect(client)
+        if self._listener is not None:
+            self._selector.unregister(self._listener)
+            self._listener.close()
+            self._listener = None
+            self._wake_read.close()
+            self._wake_write.close()
+            family, address = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(address):
+                os.unlink(address)
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def wants(self, topic):
+        # Saves encoding messages nobody listens to
+        with self._lock:
+            return any(topic in client.topics for client in self._clients.values())
+
+    def publish(self, topic, payload):
+        message = HEADER.pack(TOPICS[topic], len(payload)) + payload
+        queued = False
+        with self._lock:
+            for client in self._clients.values():
+                if topic not in client.topics:
+                    continue
+                if client.queued + len(message) > self.max_queued:
+                    client.dropped += 1
+                    self.dropped += 1
+                    continue
+                client.outbox.append(message)
+                client.queued += len(message)
+                queued = True
+        if queued:
+            self.published += 1
+            self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_write.send(b'\0')
+        except OSError:
+            pass
+
+    def _run(self):
+        while self._running.is_set():
+            for key, events in self._selector.select(timeout=0.5):
+                if key.fileobj is self._listener:
+                    self._accept()
+                elif key.fileobj is self._wake_read:
+                    try:
+                        self._wake_read.recv(4096)
+                    except OSError:
+                        pass
+                else:
+                    client = key.data
+                    if events & selectors.EVENT_READ:
+                        self._read(client)
+                    if events & selectors.EVENT_WRITE and client.sock.fileno() != -1:
+                        self._write(client)
+            self._update_interest()
+
+    def _accept(self):
+        try:
+            sock, _ = self._listener.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        client = _Client(sock)
+        with self._lock:
+            self._clients[sock.fileno()] = client
+        self._selector.register(sock, selectors.EVENT_READ, client)
+
+    def _read(self, client):
+        try:
+            data = client.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._disconnect(client)
+            return
+        client.inbox += data
+        while b'\n' in client.inbox:
+            line, client.inbox = client.inbox.split(b'\n', 1)
+            self._handle_request(client, line)
+
+    def _handle_request(self, client, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return
+        with self._lock:
+            for topic in request.get('subscribe', []):
+                if topic in TOPICS:
+                    client.topics.add(topic)
+            for topic in request.get('unsubscribe', []):
+                client.topics.discard(topic)
+
+    def _write(self, client):
+        with self._lock:
+            while client.outbox:
+                message = client.outbox[0]
+                try:
+                    sent = client.sock.send(message)
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError:
+                    break
+                client.queued -= sent
+                if sent < len(message):
+                    client.outbox[0] = message[sent:]
+                    return
+                client.outbox.popleft()
+            else:
+                return
+        self._disconnect(client)
+
+    def _update_interest(self):
+        with self._lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            events = selectors.EVENT_READ
+            if client.outbox:
+                events |= selectors.EVENT_WRITE
+            try:
+                self._selector.modify(client.sock, events, client)
+            except (KeyError, ValueError):
+                pass
+
+    def _disconnect(self, client):
+        with self._lock:
+            self._clients.pop(client.sock.fileno(), None)
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+
+class StreamClient:
+    # Connects to a running daemon, messages() yields (topic, data) pairs
+    def __init__(self, address=None, topics=DEFAULT_TOPICS):
+        family, address = parse_address(address or default_address())
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(address)
+        self._buffer = b''
+        extra = set(topics) - set(DEFAULT_TOPICS)
+        missing = set(DEFAULT_TOPICS) - set(topics)
+        if extra or missing:
+            self._send({'subscribe': sorted(extra), 'unsubscribe': sorted(missing)})
+
+    def subscribe(self, *topics):
+        self._send({'subscribe': list(topics)})
+
+    def unsubscribe(self, *topics):
+        self._send({'unsubscribe': list(topics)})
+
+    def messages(self):
+        while True:
+            header = self._read_exactly(HEADER.size)
+            if header is None:
+                return
+            topic_id, length = HEADER.unpack(header)
+            payload = self._read_exactly(length)
+            if payload is None:
+                return
+            topic = TOPIC_NAMES.get(topic_id)
+            if topic == 'landmarks':
+                yield topic, unpack_landmarks(payload)
+            elif topic is not None:
+                yield topic, json.loads(payload)
+
+    def close(self):
+        self.sock.close()
+
+    def _send(self, request):
+        self.sock.sendall(json.dumps(request).encode() + b'\n')
+
+    def _read_exactly(self, size):
+        while len(self._buffer) < size:
+            data = self.sock.recv(65536)
+            if not data:
+                return None
+            self._buffer += data
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class StreamingActions(EventLog):
+    # Actions are recorded like in a replay and handed out per frame
+    def drain(self):
+        events, self.events = self.events, []
+        return events
+
+
+class GestureDaemon:
+    # Capture, inference and gestures without a window, results go to server
+    def __init__(self, server, profile=None, hands_config=None, adaptive=None,
+                 screen_size=(1920, 1080), stats_interval=1.0):
+        self.server = server
+        self.actions = StreamingActions(screen_size)
+        self.gestures = GesturePipeline(self.actions, profile)
+        self.inference = InferenceWorker(hands_config, adaptive=adaptive)
+        self.stats_interval = stats_interval
+
+        self.frames = 0
+        self.results = 0
+        self._running = threading.Event()
+
+    def run(self, frames):
+        # frames yields (frame_id, captured_at, bgr_frame), captured_at on the
+        # time.perf_counter clock
+        self._running.set()
+        self.inference.start()
+        last_stats = time.perf_counter()
+        mirrored = None  # reused, submit() copies the frame
+        try:
+            for frame_id, captured_at, frame in frames:
+                if not self._running.is_set():
+                    break
+                self.frames += 1
+                if mirrored is None or mirrored.shape != frame.shape:
+                    mirrored = np.empty_like(frame)
+                cv2.flip(frame, 1, dst=mirrored)
+                self.inference.submit(mirrored, frame_id, captured_at)
+                result = self.inference.poll()
+                if result is not None:
+                    self.handle_result(result)
+                elif not self.inference.running:
+                    raise Exception(f"Inference stopped: {self.inference.last_error}")
+
+                now = time.perf_counter()
+                if now - last_stats >= self.stats_interval:
+                    last_stats = now
+                    if self.server.wants('stats'):
+                        self.server.publish('stats', json.dumps(self.stats()).encode())
+        finally:
+            self.inference.stop()
+
+    def stop(self):
+        self._running.clear()
+
+    def handle_result(self, result):
+        self.results += 1
+        self.actions.timestamp = result.captured_at
+        self.actions.frame_index = result.frame_id
+        self.gestures.process(result.landmarks, result.captured_at)
+
+        events = self.actions.drain()
+        if events:
+            self.server.publish('events', json.dumps(events).encode())
+        if self.server.wants('landmarks'):
+            self.server.publish('landmarks', pack_landmarks(result))
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'results': self.results,
+            'skipped': self.inference.frames_skipped,
+            'clients': self.server.client_count,
+            'dropped': self.server.dropped,
+        }
+
+
+def camera_frames(index, width=640, height=480, fps=30):
+    capture = CameraCapture(index, width, height, fps,
+                            api_preference=default_api_preference())
+    capture.start()
+    try:
+        while True:
+            packet = capture.read_latest(timeout=0.1)
+            if packet is not None:
+                frame_id, captured_at, buffer = packet
+                try:
+                    yield frame_id, captured_at, buffer.array
+                finally:
+                    buffer.release()
+            elif not capture.running:
+                raise Exception(f"Camera {index} stopped: {capture.error}")
+    finally:
+        capture.stop()
+
+
+def file_frames(source, fps=None, loop=False):
+    # Recorded footage paced at its own frame rate, like a live camera
+    frame_id = 0
+    while True:
+        start = time.perf_counter()
+        for _, timestamp, frame in iter_frames(source, fps):
+            delay = start + timestamp - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield frame_id, time.perf_counter(), frame
+            frame_id += 1
+        if not loop:
+            return
+
+
+def listen(address, topics):
+    client = StreamClient(address, topics)
+    try:
+        for topic, data in client.messages():
+            if topic == 'landmarks':
+                print(f"landmarks frame {data['frame_id']}: {len(data['landmarks'])} hands")
+            else:
+                print(f"{topic}: {json.dumps(data)}")
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run gesture detection without a GUI and stream the results")
+    parser.add_argument('--address', default=default_address(),
+                        help="Unix socket path or host:port")
+    parser.add_argument('--camera', type=int, default=0)
+    parser.add_argument('--source', help="Video file or image directory instead of a camera")
+    parser.add_argument('--fps', type=float)
+    parser.add_argument('--loop', action='store_true', help="Repeat --source forever")
+    parser.add_argument('--profiles', default='profiles.pkl')
+    parser.add_argument('--profile', default='default')
+    parser.add_argument('--mode', action='append', default=[],
+                        choices=['keyboard', 'mouse', 'exercise'])
+    parser.add_argument('--adaptive', action='store_true', help="Use ROI-cropped inference")
+    parser.add_argument('--listen', action='store_true',
+                        help="Connect to a running daemon and print what it sends")
+    parser.add_argument('--topic', action='append', choices=list(TOPICS),
+                        help="Topics to print with --listen")
+    args = parser.parse_args()
+
+    if args.listen:
+        listen(args.address, args.topic or DEFAULT_TOPICS)
+        return
+
+    try:
+        profile = load_profile(args.profiles, args.profile)
+    except Exception as e:
+        print(f"Could not load profile {args.profile}: {e}")
+        profile = None
+
+    hands_config = None
+    if profile is not None:
+        hands_config = {
+            'max_num_hands': profile.get('max_num_hands', 2),
+            'min_detection_confidence': profile['gesture_sensitivity'],
+            'min_tracking_confidence': profile.get('min_tracking_confidence', 0.5),
+        }
+
+    server = StreamServer(args.address)
+    daemon = GestureDaemon(server, profile, hands_config,
+                           adaptive={} if args.adaptive else None)
+    daemon.gestures.virtual_keyboard_active = 'keyboard' in args.mode
+    daemon.gestures.mouse_control_active = 'mouse' in args.mode
+    daemon.gestures.exercise_mode_active = 'exercise' in args.mode
+
+    if args.source:
+        frames = file_frames(args.source, args.fps, args.loop)
+    else:
+        frames = camera_frames(args.camera)
+
+    server.start()
+    try:
+        daemon.run(frames)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json.dumps(daemon.stats()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+import ctypes
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+import cv2
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from capture import default_api_preference
+
+# Windows device change notifications, see nativeEvent in main.py
+WM_DEVICECHANGE = 0x0219
+DBT_DEVNODES_CHANGED = 0x0007
+DBT_DEVICEARRIVAL = 0x8000
+DBT_DEVICEREMOVECOMPLETE = 0x8004
+DBT_DEVTYP_DEVICEINTERFACE = 5
+DEVICE_NOTIFY_WINDOW_HANDLE = 0
+
+# Windows only broadcasts arrival/removal of ports and volumes, camera
+# interfaces have to be registered for with RegisterDeviceNotification
+KSCATEGORY_CAPTURE = uuid.UUID('65e8773d-8f56-11d0-a3b9-00a0c9223196')
+KSCATEGORY_VIDEO_CAMERA = uuid.UUID('e5323777-f976-4f5b-9b55-b94699c46e44')
+
+
+class _GUID(ctypes.Structure):
+    _fields_ = [('data', ctypes.c_ubyte * 16)]
+
+
+class _DEV_BROADCAST_DEVICEINTERFACE(ctypes.Structure):
+    _fields_ = [
+        ('dbcc_size', ctypes.c_uint32),
+        ('dbcc_devicetype', ctypes.c_uint32),
+        ('dbcc_reserved', ctypes.c_uint32),
+        ('dbcc_classguid', _GUID),
+        ('dbcc_name', ctypes.c_wchar * 1),
+    ]
+
+
+def register_device_notifications(hwnd, categories=(KSCATEGORY_CAPTURE, KSCATEGORY_VIDEO_CAMERA)):
+    # Sends WM_DEVICECHANGE for camera interfaces to hwnd, returns the handles
+    # for unregister_device_notifications
+    user32 = ctypes.windll.user32
+    user32.RegisterDeviceNotificationW.restype = ctypes.c_void_p
+    user32.RegisterDeviceNotificationW.argtypes = [ctypes.c_void_p, ctypes.c_void_p,
+                                                   ctypes.c_uint32]
+    handles = []
+    for category in categories:
+        dbi = _DEV_BROADCAST_DEVICEINTERFACE()
+        dbi.dbcc_size = ctypes.sizeof(dbi)
+        dbi.dbcc_devicetype = DBT_DEVTYP_DEVICEINTERFACE
+        dbi.dbcc_classguid.data[:] = category.bytes_le
+        handle = user32.RegisterDeviceNotificationW(
+            ctypes.c_void_p(hwnd), ctypes.byref(dbi), DEVICE_NOTIFY_WINDOW_HANDLE)
+        if handle:
+            handles.append(handle)
+        else:
+            print(f"Could not register for {category} notifications: {ctypes.GetLastError()}")
+    return handles
+
+
+def unregister_device_notifications(handles):
+    user32 = ctypes.windll.user32
+    user32.UnregisterDeviceNotification.argtypes = [ctypes.c_void_p]
+    for handle in handles:
+        user32.UnregisterDeviceNotification(ctypes.c_void_p(handle))
+
+
+def probe_camera(index, api_preference):
+    # Opens the device and reads one frame, returns its capabilities or None
+    cap = cv2.VideoCapture(index, api_preference)
+    try:
+        if not cap.isOpened():
+            return None
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            return None
+        return {
+            'index': index,
+            'width': frame.shape[1],
+            'height': frame.shape[0],
+            'fps': cap.get(cv2.CAP_PROP_FPS) or None,
+        }
+    finally:
+        cap.release()
+
+
+class CameraDiscovery(QObject):
+    # Finds cameras without holding up startup. The last known list is loaded
+    # from disk and published right away, then every index is probed in
+    # parallel (each with its own timeout) in the background. Hot-plug events
+    # only re-probe the devices that can have changed.
+    cameras_changed = pyqtSignal(list)
+
+    def __init__(self, cache_path="camera_cache.json", max_index=10, timeout=3.0,
+                 api_preference=None, parent=None):
+        super().__init__(parent)
+        self.cache_path = cache_path
+        self.max_index = max_index
+        self.timeout = timeout
+        self.api_preference = default_api_preference() if api_preference is None else api_preference
+
+        self.cameras = {}  # index -> capabilities
+        self.busy = set()  # indices in use by the app, never probed
+        self.last_scan_duration = None
+        self._published = False
+
+        self._lock = threading.Lock()
+        self._pending = set()  # indices waiting for the scan thread
+        self._scanning = False
+        self._watching = threading.Event()
+        self._watch_thread = None
+        self._notification_handles = []
+        self._devnodes_timer = None
+
+    def start(self):
+        cached = self.load_cache()
+        if cached:
+            with self._lock:
+                self.cameras = {camera['index']: camera for camera in cached}
+            self._published = True
+            self.cameras_changed.emit(self.camera_list())
+        # Revalidate the cached list in the background
+        self.rescan()
+        self.watch()
+
+    def stop(self):
+        self._watching.clear()
+        if self._devnodes_timer is not None:
+            self._devnodes_timer.cancel()
+        if self._notification_handles:
+            unregister_device_notifications(self._notification_handles)
+            self._notification_handles = []
+
+    def register_window(self, hwnd):
+        # Windows: ask for camera arrival/removal messages on hwnd, they come
+        # back through handle_native_event
+        if sys.platform != 'win32' or self._notification_handles:
+            return
+        try:
+            self._notification_handles = register_device_notifications(hwnd)
+        except Exception as e:
+            print(f"Could not register for device notifications: {e}")
+
+    def camera_list(self):
+        with self._lock:
+            return [self.cameras[index] for index in sorted(self.cameras)]
+
+    def rescan(self, indices=None):
+        # Probe the given indices (all of them by default) on a background
+        # thread. Only one scan runs at a time, indices asked for meanwhile
+        # are merged into the next one.
+        if indices is None:
+            indices = range(self.max_index)
+        with self._lock:
+            self._pending.update(indices)
+            if self._scanning:
+                return
+            self._scanning = True
+        threading.Thread(target=self._scan_pending, name="camera-discovery",
+                         daemon=True).start()
+
+    def device_arrived(self):
+        # Only indices we don't know yet can be new
+        with self._lock:
+            known = set(self.cameras)
+        self.rescan(i for i in range(self.max_index) if i not in known)
+
+    def device_removed(self):
+        # Only known devices can disappear
+        with self._lock:
+            known = set(self.cameras)
+        self.rescan(known - self.busy)
+
+    def handle_native_event(self, message_type, wparam):
+        # Fed from QWidget.nativeEvent on Windows
+        if message_type != WM_DEVICECHANGE:
+            return
+        if wparam == DBT_DEVICEARRIVAL:
+            self.device_arrived()
+        elif wparam == DBT_DEVICEREMOVECOMPLETE:
+            self.device_removed()
+        elif wparam == DBT_DEVNODES_CHANGED:
+            self.devnodes_changed()
+
+    def devnodes_changed(self, delay=0.5):
+        # Sent for any device, without saying which. Bursts are coalesced into
+        # one rescan of everything the app isn't using.
+        if self._devnodes_timer is not None:
+            self._devnodes_timer.cancel()
+        self._devnodes_timer = threading.Timer(delay, self.rescan)
+        self._devnodes_timer.daemon = True
+        self._devnodes_timer.start()
+
+    def watch(self, interval=2.0):
+        # Linux has no window messages, watch /dev/video* instead
+        if not sys.platform.startswith('linux') or self._watch_thread is not None:
+            return
+        self._watching.set()
+        self._watch_thread = threading.Thread(
+            target=self._watch_devices, args=(interval,), name="camera-watch", daemon=True)
+        self._watch_thread.start()
+
+    def _watch_devices(self, interval):
+        previous = self._video_devices()
+        while self._watching.is_set():
+            time.sleep(interval)
+            current = self._video_devices()
+            changed = previous ^ current
+            if changed:
+                self.rescan(i for i in changed if i < self.max_index)
+            previous = current
+
+    @staticmethod
+    def _video_devices():
+        try:
+            return {int(name[5:]) for name in os.listdir('/dev')
+                    if name.startswith('video') and name[5:].isdigit()}
+        except OSError:
+            return set()
+
+    def _probe_all(self, indices):
+        # One thread per device, a hanging driver only costs its own timeout
+        results = {}
+
+        def probe(index):
+            try:
+                results[index] = probe_camera(index, self.api_preference)
+            except Exception as e:
+                print(f"Error checking camera {index}: {e}")
+                results[index] = None
+
+        threads = [threading.Thread(target=probe, args=(index,), daemon=True)
+                   for index in indices]
+        for thread in threads:
+            thread.start()
+
+        deadline = time.perf_counter() + self.timeout
+        for index, thread in zip(indices, threads):
+            thread.join(max(0.0, deadline - time.perf_counter()))
+            if thread.is_alive():
+                print(f"Camera {index} timed out")
+        # Devices that timed out are left out, their state is unknown
+        return {index: results[index] for index in indices if index in results}
+
+    def _scan_pending(self):
+        while True:
+            with self._lock:
+                indices = sorted(self._pending)
+                self._pending.clear()
+                if not indices:
+                    self._scanning = False
+                    return
+            try:
+                self._scan(indices)
+            except Exception as e:
+                print(f"Camera scan failed: {e}")
+
+    def _scan(self, indices):
+        indices = [index for index in indices if index not in self.busy]
+        if not indices:
+            return
+        start = time.perf_counter()
+        results = self._probe_all(indices)
+        self.last_scan_duration = time.perf_counter() - start
+
+        with self._lock:
+            before = dict(self.cameras)
+            for index, camera in results.items():
+                if camera is None:
+                    self.cameras.pop(index, None)
+                else:
+                    self.cameras[index] = camera
+            changed = self.cameras != before
+
+        if changed or not self._published:
+            cameras = self.camera_list()
+            self.save_cache(cameras)
+            self._published = True
+            self.cameras_changed.emit(cameras)
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)['cameras']
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def save_cache(self, cameras):
+        try:
+            with open(self.cache_path, 'w') as f:
+                json.dump({'updated': time.time(), 'cameras': cameras}, f, indent=2)
+        except OSError as e:
+            print(f"Could not save camera cache: {e}")
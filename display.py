@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+from PyQt5.QtCore import QRectF, Qt, QTimer
+from PyQt5.QtGui import QColor, QImage, QPainter
+from PyQt5.QtWidgets import QOpenGLWidget, QWidget
+
+BACKGROUND = QColor("#34495e")
+
+
+class _FrameViewMixin:
+    # Paints BGR frames straight from their NumPy buffer. No rgbSwapped copy and
+    # no per-frame QPixmap, scaling happens while painting: smooth normally and
+    # with the fast filter while the window is being resized.
+    def _init_view(self, preview_fps):
+        self.setMinimumSize(640, 480)
+        self.preview_fps = preview_fps
+        self.frames_shown = 0
+
+        self._frame = None
+        self._image = None
+        self._last_shown = float('-inf')
+        self._resizing = False
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(200)
+        self._resize_timer.timeout.connect(self._resize_finished)
+
+    def wants_frame(self, now=None):
+        # Preview refreshes at preview_fps, independently of the inference rate
+        if not self.preview_fps:
+            return True
+        now = time.perf_counter() if now is None else now
+        return now - self._last_shown >= 1.0 / self.preview_fps
+
+    def display_size(self, width, height):
+        # Device pixels a width x height frame covers once scaled into the view
+        scale = min(self.width() / width, self.height() / height) * self.devicePixelRatioF()
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    def show_frame(self, frame):
+        # frame is a BGR uint8 array, it must not be modified until the next frame
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+        h, w = frame.shape[:2]
+        # QImage only points at the buffer, keep the array alive alongside it
+        self._frame = frame
+        self._image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+        self._last_shown = time.perf_counter()
+        self.frames_shown += 1
+        self.update()
+
+    def clear(self):
+        self._frame = None
+        self._image = None
+        self.update()
+
+    def resizeEvent(self, event):
+        self._resizing = True
+        self._resize_timer.start()
+        super().resizeEvent(event)
+
+    def _resize_finished(self):
+        self._resizing = False
+        self.update()
+
+    def _target_rect(self):
+        # Keep aspect ratio, centered in the widget
+        image_w, image_h = self._image.width(), self._image.height()
+        scale = min(self.width() / image_w, self.height() / image_h)
+        w, h = image_w * scale, image_h * scale
+        return QRectF((self.width() - w) / 2, (self.height() - h) / 2, w, h)
+
+    def _paint(self):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(BACKGROUND)
+        painter.drawRoundedRect(QRectF(self.rect()), 10, 10)
+
+        if self._image is not None:
+            painter.setRenderHint(QPainter.SmoothPixmapTransform, not self._resizing)
+            painter.drawImage(self._target_rect(), self._image)
+        painter.end()
+
+
+class CameraView(_FrameViewMixin, QWidget):
+    def __init__(self, *args, preview_fps=30, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_view(preview_fps)
+
+    def paintEvent(self, event):
+        self._paint()
+
+
+class GLCameraView(_FrameViewMixin, QOpenGLWidget):
+    # Same view, scaled and composited on the GPU
+    def __init__(self, *args, preview_fps=30, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_view(preview_fps)
+
+    def paintGL(self):
+        self._paint()
+
+
+def create_camera_view(use_opengl=False, preview_fps=30):
+    if use_opengl:
+        return GLCameraView(preview_fps=preview_fps)
+    return CameraView(preview_fps=preview_fps)
@@ -0,0 +1,108 @@
+import threading
+
+import numpy as np
+
+
+class FrameBuffer:
+    # A pooled frame array with a reference count. Stages hand the buffer on
+    # instead of copying the pixels; whoever keeps it calls retain(), everyone
+    # calls release() when done, and the last release returns the array to its
+    # pool. The array must not be used after that.
+    __slots__ = ('array', 'pool', 'refs')
+
+    def __init__(self, array, pool):
+        self.array = array
+        self.pool = pool
+        self.refs = 1
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    def retain(self):
+        with self.pool.lock:
+            if self.refs <= 0:
+                raise RuntimeError("frame buffer used after release")
+            self.refs += 1
+        return self
+
+    def release(self):
+        self.pool.release(self)
+
+
+class FramePool:
+    # Keeps up to max_free released frame arrays for reuse, so the frame loop
+    # stops allocating once it reached its steady state. Shapes that weren't
+    # used for a while (an old preview size) give up their arrays first.
+    def __init__(self, max_free=8, dtype=np.uint8):
+        self.max_free = max_free
+        self.dtype = dtype
+        self.lock = threading.Lock()
+        self._free = {}  # shape -> [array], least recently used shape first
+        self._free_count = 0
+
+        self.allocated = 0
+        self.reused = 0
+        self.in_use = 0
+
+    def acquire(self, shape):
+        # A buffer with one reference, the contents are undefined
+        shape = tuple(shape)
+        with self.lock:
+            free = self._free.pop(shape, None)
+            array = free.pop() if free else None
+            if free:
+                self._free[shape] = free
+            self.in_use += 1
+            if array is not None:
+                self._free_count -= 1
+                self.reused += 1
+            else:
+                self.allocated += 1
+        if array is None:
+            array = np.empty(shape, dtype=self.dtype)
+        return FrameBuffer(array, self)
+
+    def adopt(self, array):
+        # Wraps an array allocated elsewhere, it joins the pool when released
+        with self.lock:
+            self.allocated += 1
+            self.in_use += 1
+        return FrameBuffer(array, self)
+
+    def release(self, buffer):
+        with self.lock:
+            if buffer.refs <= 0:
+                raise RuntimeError("frame buffer released too often")
+            buffer.refs -= 1
+            if buffer.refs:
+                return
+            self.in_use -= 1
+            if buffer.array.dtype != self.dtype or self.max_free <= 0:
+                return
+            shape = buffer.array.shape
+            free = self._free.pop(shape, [])
+            free.append(buffer.array)
+            self._free[shape] = free
+            self._free_count += 1
+            while self._free_count > self.max_free:
+                oldest = next(iter(self._free))
+                self._free[oldest].pop()
+                self._free_count -= 1
+                if not self._free[oldest]:
+                    del self._free[oldest]
+
+    def clear(self):
+        # Drops the free arrays, buffers in use return as usual
+        with self.lock:
+            self._free.clear()
+            self._free_count = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'allocated': self.allocated,
+                'reused': self.reused,
+                'in_use': self.in_use,
+                'free': self._free_count,
+            }
@@ -0,0 +1,98 @@
+from collections import namedtuple
+
+# kind is 'enter', 'hold' or 'exit'
+GestureEvent = namedtuple("GestureEvent", ["kind", "name", "command", "timestamp"])
+
+DEFAULT_DWELL = 0.15
+DEFAULT_COOLDOWN = 0.5
+
+# "Nothing pending", None is a real state (no hand visible)
+_NO_PENDING = object()
+
+
+class GestureRule:
+    # Fires command once state has been held for dwell seconds, at most once per
+    # cooldown. With repeat set, keeps emitting hold events while the state lasts.
+    def __init__(self, name, state, command, dwell=DEFAULT_DWELL,
+                 cooldown=DEFAULT_COOLDOWN, repeat=None):
+        self.name = name
+        self.state = state
+        self.command = command
+        self.dwell = dwell
+        self.cooldown = cooldown
+        self.repeat = repeat
+
+
+class GestureStateMachine:
+    # Tracks one discrete hand state (e.g. the finger count) over time and turns
+    # it into enter/hold/exit events. Rules are indexed by state, so each update
+    # only looks at the rules for the current state.
+    def __init__(self, rules, exit_grace=0.1):
+        self.exit_grace = exit_grace
+        self.rules = {}
+        for rule in rules:
+            self.rules.setdefault(rule.state, []).append(rule)
+
+        self.events_emitted = 0
+        self._state = None
+        self._since = None
+        self._pending_state = _NO_PENDING
+        self._pending_since = None
+        self._active = {}  # rule name -> time of the last enter/hold event
+        self._last_fired = {}
+
+    @classmethod
+    def from_shortcuts(cls, shortcuts, exit_grace=0.1):
+        # Profile shortcuts map a finger count to either a command string or a
+        # dict with command and optional dwell, cooldown and repeat
+        rules = []
+        for count, shortcut in shortcuts.items():
+            try:
+                state = int(count)
+            except (TypeError, ValueError):
+                print(f"Ignoring shortcut {count!r}: not a finger count")
+                continue
+            if isinstance(shortcut, str):
+                shortcut = {'command': shortcut}
+            rules.append(GestureRule(
+                name=f"fingers_{count}",
+                state=state,
+                command=shortcut['command'],
+                dwell=shortcut.get('dwell', DEFAULT_DWELL),
+                cooldown=shortcut.get('cooldown', DEFAULT_COOLDOWN),
+                repeat=shortcut.get('repeat')))
+        return cls(rules, exit_grace)
+
+    def update(self, state, now):
+        # state is the current hand state, None when no hand is visible
+        events = []
+
+        if state != self._state:
+            if self._pending_state is _NO_PENDING or state != self._pending_state:
+                self._pending_state = state
+                self._pending_since = now
+            # Ignore short flickers while a gesture is active
+            if self._active and now - self._pending_since < self.exit_grace:
+                return events
+
+            for rule in self.rules.get(self._state, ()):
+                if rule.name in self._active:
+                    events.append(GestureEvent('exit', rule.name, rule.command, now))
+            self._active.clear()
+            self._state = state
+            self._since = self._pending_since
+        self._pending_state = _NO_PENDING
+
+        for rule in self.rules.get(self._state, ()):
+            if rule.name in self._active:
+                if rule.repeat is not None and now - self._active[rule.name] >= rule.repeat:
+                    self._active[rule.name] = now
+                    events.append(GestureEvent('hold', rule.name, rule.command, now))
+            elif (now - self._since >= rule.dwell
+                    and now - self._last_fired.get(rule.name, float('-inf')) >= rule.cooldown):
+                self._active[rule.name] = now
+                self._last_fired[rule.name] = now
+                events.append(GestureEvent('enter', rule.name, rule.command, now))
+
+        self.events_emitted += len(events)
+        return events
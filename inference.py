@@ -0,0 +1,488 @@
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from landmarks import as_hands, empty_hands
+
+# Compact per-frame hand detection result handed back to the GUI.
+# landmarks: float32 (hands, 21, 3), handedness: int8 (hands,), 0 = left, 1 = right
+InferenceResult = namedtuple(
+    "InferenceResult",
+    ["frame_id", "captured_at", "landmarks", "handedness", "inference_time"])
+
+DEFAULT_HANDS_CONFIG = {
+    'static_image_mode': False,
+    'max_num_hands': 2,
+    'min_detection_confidence': 0.7,
+    'min_tracking_confidence': 0.5,
+}
+
+
+def create_hands(config):
+    import mediapipe as mp
+    return mp.solutions.hands.Hands(**config)
+
+
+def hands_key(config):
+    # Full configuration as a hashable key, every option changes the graph
+    return tuple(sorted(dict(DEFAULT_HANDS_CONFIG, **config).items()))
+
+
+class HandsPool:
+    # Keeps up to max_size Hands instances keyed by their full configuration, so
+    # switching back to a configuration seen before costs nothing. The least
+    # recently used instance is closed once the pool is full.
+    def __init__(self, max_size=4):
+        self.max_size = max(1, max_size)
+        self.created = 0
+        self.hits = 0
+        self.evicted = 0
+
+        self._hands = OrderedDict()
+        self._lock = threading.Lock()
+        self._warm_thread = None
+
+    def get(self, config):
+        key = hands_key(config)
+        with self._lock:
+            hands = self._hands.get(key)
+            if hands is not None:
+                self._hands.move_to_end(key)
+                self.hits += 1
+                return hands
+            hands = create_hands(dict(key))
+            self.created += 1
+            self._hands[key] = hands
+            self._evict()
+            return hands
+
+    def prewarm(self, configs):
+        # Build the missing instances on a background thread
+        missing = [config for config in configs if hands_key(config) not in self._hands]
+        if not missing or (self._warm_thread is not None and self._warm_thread.is_alive()):
+            return
+
+        def warm():
+            for config in missing:
+                key = hands_key(config)
+                with self._lock:
+                    if key in self._hands:
+                        continue
+                    if len(self._hands) >= self.max_size:
+                        return
+                    try:
+                        # Warm instances go to the cold end, the active one stays most recent
+                        self._hands[key] = create_hands(dict(key))
+                        self._hands.move_to_end(key, last=False)
+                        self.created += 1
+                    except Exception as e:
+                        print(f"Could not pre-warm hand detector: {e}")
+                        return
+
+        self._warm_thread = threading.Thread(target=warm, name="hands-prewarm", daemon=True)
+        self._warm_thread.start()
+
+    def stats(self):
+        return {
+            'size': len(self._hands),
+            'created': self.created,
+            'hits': self.hits,
+            'evicted': self.evicted,
+        }
+
+    def close(self):
+        if self._warm_thread is not None:
+            self._warm_thread.join()
+            self._warm_thread = None
+        with self._lock:
+            for hands in self._hands.values():
+                hands.close()
+            self._hands.clear()
+
+    def _evict(self):
+        # The most recently used entry is the one in use, it's never evicted
+        while len(self._hands) > self.max_size:
+            _, hands = self._hands.popitem(last=False)
+            hands.close()
+            self.evicted += 1
+
+
+def detect_hands(hands, rgb_frame):
+    # Run MediaPipe once and flatten the protobuf result into NumPy arrays
+    results = hands.process(rgb_frame)
+    if not results.multi_hand_landmarks:
+        return empty_hands()
+
+    landmarks = as_hands(np.fromiter(
+        (value
+         for hand in results.multi_hand_landmarks
+         for lm in hand.landmark
+         for value in (lm.x, lm.y, lm.z)),
+        dtype=np.float32))
+    handedness = np.zeros(len(landmarks), dtype=np.int8)
+    if results.multi_handedness:
+        for i, hand in enumerate(results.multi_handedness[:len(landmarks)]):
+            handedness[i] = 1 if hand.classification[0].label == "Right" else 0
+    return landmarks, handedness
+
+
+def to_landmark_lists(landmarks):
+    # Rebuild MediaPipe landmark lists, e.g. for mp_drawing
+    from mediapipe.framework.formats import landmark_pb2
+    hand_lists = []
+    for hand in landmarks:
+        hand_list = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in hand:
+            hand_list.landmark.add(x=float(x), y=float(y), z=float(z))
+        hand_lists.append(hand_list)
+    return hand_lists
+
+
+class HandDetector:
+    # Full-frame detection, every frame goes into Hands.process as is.
+    # Hands instances come from pool, a private one-entry pool by default.
+    def __init__(self, config, pool=None):
+        self.config = dict(config)
+        self._owns_pool = pool is None
+        self.pool = HandsPool(max_size=1) if pool is None else pool
+        self.hands = self.pool.get(self.config)
+
+    def detect(self, rgb_frame):
+        return detect_hands(self.hands, rgb_frame)
+
+    def reconfigure(self, config):
+        self.config = dict(config)
+        self.hands = self.pool.get(self.config)
+
+    def close(self):
+        if self._owns_pool:
+            self.pool.close()
+        self.hands = None
+
+
+class AdaptiveHandDetector(HandDetector):
+    # Crops around the hands found in the previous frame and runs detection on a
+    # small, fixed-size square. Falls back to a downscaled full frame whenever
+    # tracking is lost, and every full_frame_interval frames to pick up new hands.
+    def __init__(self, config, margin=0.3, roi_size=256, detection_scale=0.5,
+                 full_frame_interval=15, pool=None):
+        super().__init__(config, pool)
+        self.margin = margin
+        self.roi_size = roi_size
+        self.detection_scale = detection_scale
+        self.full_frame_interval = full_frame_interval
+
+        self.roi_frames = 0
+        self.full_frames = 0
+
+        self._previous = None
+        self._since_full_frame = 0
+        self._roi_buffer = np.empty((roi_size, roi_size, 3), dtype=np.uint8)
+        self._scaled_buffer = None
+
+    def reconfigure(self, config):
+        super().reconfigure(config)
+        self._previous = None
+
+    def detect(self, rgb_frame):
+        max_hands = self.config.get('max_num_hands', 2)
+        missing_hands = self._previous is not None and len(self._previous) < max_hands
+        if (self._previous is not None
+                and not (missing_hands and self._since_full_frame >= self.full_frame_interval)):
+            landmarks, handedness = self._detect_roi(rgb_frame, self._previous)
+            if len(landmarks):
+                self._since_full_frame += 1
+                self._previous = landmarks
+                return landmarks, handedness
+
+        # Tracking lost (or due for a refresh), look at the whole frame
+        landmarks, handedness = self._detect_full_frame(rgb_frame)
+        self._since_full_frame = 0
+        self._previous = landmarks if len(landmarks) else None
+        return landmarks, handedness
+
+    def roi_for(self, landmarks, frame_w, frame_h):
+        # Square pixel box around all hands, grown by margin and clamped to the frame
+        xs = landmarks[:, :, 0] * frame_w
+        ys = landmarks[:, :, 1] * frame_h
+        x0, x1 = float(xs.min()), float(xs.max())
+        y0, y1 = float(ys.min()), float(ys.max())
+
+        side = max(x1 - x0, y1 - y0) * (1 + 2 * self.margin)
+        side = int(min(max(side, 32), frame_w, frame_h))
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        left = int(min(max(cx - side / 2, 0), frame_w - side))
+        top = int(min(max(cy - side / 2, 0), frame_h - side))
+        return left, top, side
+
+    def _detect_roi(self, rgb_frame, previous):
+        frame_h, frame_w = rgb_frame.shape[:2]
+        left, top, side = self.roi_for(previous, frame_w, frame_h)
+        crop = rgb_frame[top:top + side, left:left + side]
+        cv2.resize(crop, (self.roi_size, self.roi_size), dst=self._roi_buffer,
+                   interpolation=cv2.INTER_AREA)
+        self.roi_frames += 1
+
+        landmarks, handedness = detect_hands(self.hands, self._roi_buffer)
+        if len(landmarks):
+            # Crop-normalised coordinates back to full-frame coordinates
+            landmarks[:, :, 0] = (landmarks[:, :, 0] * side + left) / frame_w
+            landmarks[:, :, 1] = (landmarks[:, :, 1] * side + top) / frame_h
+            landmarks[:, :, 2] *= side / frame_w
+        return landmarks, handedness
+
+    def _detect_full_frame(self, rgb_frame):
+        self.full_frames += 1
+        if self.detection_scale >= 1:
+            return detect_hands(self.hands, rgb_frame)
+
+        frame_h, frame_w = rgb_frame.shape[:2]
+        size = (max(1, int(frame_w * self.detection_scale)),
+                max(1, int(frame_h * self.detection_scale)))
+        if self._scaled_buffer is None or self._scaled_buffer.shape[1::-1] != size:
+            self._scaled_buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        cv2.resize(rgb_frame, size, dst=self._scaled_buffer, interpolation=cv2.INTER_AREA)
+        # Normalised landmarks are resolution independent, nothing to map back
+        return detect_hands(self.hands, self._scaled_buffer)
+
+
+def create_detector(config, adaptive=None, pool=None):
+    # adaptive: None for full-frame detection, or AdaptiveHandDetector options
+    if adaptive is None:
+        return HandDetector(config, pool)
+    return AdaptiveHandDetector(config, pool=pool, **adaptive)
+
+
+def _worker_loop(requests, results, get_frame, config, adaptive=None,
+                 release_frames=None, pool_size=4):
+    pool = HandsPool(pool_size)
+    detector = create_detector(config, adaptive, pool)
+    rgb = None
+    try:
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+
+            kind = message[0]
+            if kind == 'configure':
+                detector.reconfigure(message[1])
+                continue
+            if kind == 'prewarm':
+                pool.prewarm(message[1])
+                continue
+            if kind == 'release':
+                if release_frames is not None:
+                    release_frames()
+                continue
+
+            _, slot, shm_name, shape, frame_id, captured_at = message
+            try:
+                frame = get_frame(slot, shm_name, shape)
+                if rgb is None or rgb.shape != frame.shape:
+                    rgb = np.empty(frame.shape, dtype=np.uint8)
+                cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+                frame = None
+
+                start = time.perf_counter()
+                landmarks, handedness = detector.detect(rgb)
+                results.put(('result', InferenceResult(
+                    frame_id, captured_at, landmarks, handedness,
+                    time.perf_counter() - start)))
+            except Exception as e:
+                results.put(('error', frame_id, str(e)))
+    finally:
+        detector.close()
+        pool.close()
+
+
+def _process_main(requests, results, config, adaptive, pool_size):
+    # Entry point of the worker process, frames arrive through shared memory
+    attached = {}
+
+    def get_frame(slot, shm_name, shape):
+        shm = attached.get(shm_name)
+        if shm is None:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            attached[shm_name] = shm
+        return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+    def release_frames():
+        for shm in attached.values():
+            shm.close()
+        attached.clear()
+
+    try:
+        _worker_loop(requests, results, get_frame, config, adaptive, release_frames,
+                     pool_size)
+    except Exception as e:
+        results.put(('error', None, str(e)))
+    finally:
+        release_frames()
+
+
+class InferenceWorker:
+    # Runs hand detection off the GUI thread and hands back compact results.
+    # When inference falls behind, new frames are skipped instead of queued.
+    # adaptive enables ROI-cropped detection, see AdaptiveHandDetector.
+    # pool_size Hands instances are kept around for configure(), see HandsPool.
+    def __init__(self, config=None, use_process=True, max_in_flight=1, adaptive=None,
+                 pool_size=4):
+        self.config = dict(DEFAULT_HANDS_CONFIG, **(config or {}))
+        self.adaptive = adaptive
+        self.pool_size = pool_size
+        self.use_process = use_process
+        self.max_in_flight = max_in_flight
+
+        self.frames_submitted = 0
+        self.frames_skipped = 0
+        self.frames_processed = 0
+        self.last_error = None
+
+        self._in_flight = 0
+        self._next_slot = 0
+        self._slots = []
+        self._slot_shape = None
+        self._worker = None
+
+    def start(self):
+        if self.use_process:
+            ctx = multiprocessing.get_context('spawn')
+            self._requests = ctx.Queue()
+            self._results = ctx.Queue()
+            self._worker = ctx.Process(
+                target=_process_main,
+                args=(self._requests, self._results, self.config, self.adaptive,
+                      self.pool_size),
+                name="hand-inference", daemon=True)
+        else:
+            self._requests = queue.Queue()
+            self._results = queue.Queue()
+            self._worker = threading.Thread(
+                target=_worker_loop,
+                args=(self._requests, self._results,
+                      lambda slot, name, shape: self._slots[slot],
+                      self.config, self.adaptive, None, self.pool_size),
+                name="hand-inference", daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout=2.0):
+        if self._worker is None:
+            return
+        self._requests.put(None)
+        self._worker.join(timeout)
+        if self.use_process and self._worker.is_alive():
+            self._worker.terminate()
+        self._worker = None
+        self._release_slots()
+        self._in_flight = 0
+
+    @property
+    def running(self):
+        return self._worker is not None and self._worker.is_alive()
+
+    @property
+    def busy(self):
+        return self._in_flight >= self.max_in_flight
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def configure(self, **config):
+        # Options not given keep their current value
+        self.config.update(config)
+        if self._worker is not None:
+            self._requests.put(('configure', dict(self.config)))
+
+    def prewarm(self, configs):
+        # Load detectors for configurations we're likely to switch to
+        if self._worker is not None:
+            self._requests.put(('prewarm', [dict(self.config, **config) for config in configs]))
+
+    def submit(self, frame, frame_id, captured_at):
+        # Returns False when the frame was skipped because of backpressure
+        if self._worker is None or self.busy:
+            self.frames_skipped += 1
+            return False
+        if self._slot_shape != frame.shape and self._in_flight:
+            # Resolution changed, wait until the worker let go of the old buffers
+            self.frames_skipped += 1
+            return False
+
+        self._ensure_slots(frame.shape)
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.max_in_flight
+        if self.use_process:
+            shm = self._slots[slot]
+            np.copyto(np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf), frame)
+            shm_name = shm.name
+        else:
+            np.copyto(self._slots[slot], frame)
+            shm_name = None
+
+        self._requests.put(('frame', slot, shm_name, frame.shape, frame_id, captured_at))
+        self._in_flight += 1
+        self.frames_submitted += 1
+        return True
+
+    def poll(self):
+        # Drain finished results without blocking, returns the newest one or None
+        latest = None
+        while True:
+            try:
+                message = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'result':
+                self._in_flight = max(0, self._in_flight - 1)
+                self.frames_processed += 1
+                latest = message[1]
+            else:
+                if message[1] is not None:
+                    self._in_flight = max(0, self._in_flight - 1)
+                self.last_error = message[2]
+                print(f"Inference error: {message[2]}")
+        if self._worker is not None and not self._worker.is_alive():
+            # Crashed or killed, nothing in flight is coming back. running
+            # turns False, the owner decides whether to start it again.
+            exitcode = getattr(self._worker, 'exitcode', None)
+            self.last_error = "inference worker exited"
+            if exitcode is not None:
+                self.last_error += f" with code {exitcode}"
+            print(f"Inference error: {self.last_error}")
+            self._worker = None
+            self._release_slots()
+            self._in_flight = 0
+        return latest
+
+    def _ensure_slots(self, shape):
+        if self._slot_shape == shape:
+            return
+        # Only reallocate while the worker isn't reading any slot
+        self._release_slots()
+        nbytes = int(np.prod(shape))
+        if self.use_process:
+            self._slots = [shared_memory.SharedMemory(create=True, size=nbytes)
+                           for _ in range(self.max_in_flight)]
+        else:
+            self._slots = [np.empty(shape, dtype=np.uint8)
+                           for _ in range(self.max_in_flight)]
+        self._slot_shape = shape
+        self._next_slot = 0
+
+    def _release_slots(self):
+        if self.use_process and self._slots:
+            if self._worker is not None:
+                self._requests.put(('release',))
+            for shm in self._slots:
+                shm.close()
+                shm.unlink()
+        self._slots = []
+        self._slot_shape = None
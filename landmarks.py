@@ -0,0 +1,54 @@
+import numpy as np
+
+# Per-frame hand data is a contiguous float32 array of shape (hands, 21, 3)
+# holding normalised x, y, z, plus an int8 handedness array of shape (hands,)
+NUM_LANDMARKS = 21
+LEFT, RIGHT = 0, 1
+
+# MediaPipe hand landmark indices
+WRIST = 0
+THUMB_IP = 3
+THUMB_TIP = 4
+INDEX_TIP = 8
+MIDDLE_MCP = 9
+MIDDLE_TIP = 12
+RING_TIP = 16
+PINKY_TIP = 20
+
+FINGER_TIPS = np.array([INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP])
+
+# Landmarks compared between the two hands, see pair_deltas
+PAIR_LANDMARKS = np.array([INDEX_TIP, MIDDLE_MCP])
+PAIR_INDEX_TIP = 0
+PAIR_MIDDLE_MCP = 1
+
+
+def empty_hands():
+    return (np.empty((0, NUM_LANDMARKS, 3), dtype=np.float32),
+            np.empty(0, dtype=np.int8))
+
+
+def as_hands(landmarks):
+    return np.ascontiguousarray(landmarks, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3)
+
+
+def fingers_extended(hands):
+    # (hands, 5) bool: thumb, index, middle, ring, pinky
+    extended = np.empty((len(hands), 5), dtype=bool)
+    extended[:, 0] = hands[:, THUMB_TIP, 0] < hands[:, THUMB_IP, 0]
+    extended[:, 1:] = hands[:, FINGER_TIPS, 1] < hands[:, FINGER_TIPS - 2, 1]
+    return extended
+
+
+def count_fingers(hands):
+    # (hands,) number of raised fingers per hand
+    return fingers_extended(hands).sum(axis=1)
+
+
+def pair_deltas(hands, indices=PAIR_LANDMARKS):
+    # (len(indices), 2) xy offsets between the same landmarks of the first two hands
+    return hands[0, indices, :2] - hands[1, indices, :2]
+
+
+def pair_distances(deltas):
+    return np.hypot(deltas[:, 0], deltas[:, 1])
@@ -1,34 +1,35 @@
 import sys
-import cv2
-import mediapipe as mp
-import numpy as np
-import json
 import os
 import time
 import datetime
-import keyboard
-import screen_brightness_control as sbc
+import importlib
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtWebChannel import QWebChannel
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-import pyautogui
 import threading
-import sounddevice as sd
-import soundfile as sf
-import pygame
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
-from PIL import Image, ImageEnhance
 import pickle
+import ctypes.wintypes
+from actuators import (CursorActuator, PyAutoGuiCursorBackend, ScreenGeometry,
+                       VolumeActuator, create_volume_backend)
+from backends import BackendRegistry
+from capture import CameraCapture, default_api_preference
+from frames import FramePool
+from discovery import CameraDiscovery
+from display import create_camera_view
+from metrics import MetricsRegistry, MetricsServer, MetricsSnapshotWriter
+from multicam import CameraChannel, CameraSet
+from notifications import ToastManager
+from tracing import tracer
+from tracking import LandmarkPredictor
+from overlay import OverlayRenderer
+from screenshots import ScreenPreroll, ScreenshotWriter
+from inference import InferenceWorker
+from pipeline import GesturePipeline
+from webui import WebUi, register_preview_scheme
+from media import HttpMediaBackend, MediaDispatcher, SpotifyMediaBackend
 
-# MediaPipe modules
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
+# Heavy integrations (MediaPipe, Spotify, pycaw, pyautogui, keyboard) are
+# imported by their backend factories in GestureControlApp.register_backends
 
 # Modern UI components
 class ModernButton(QPushButton):
@@ -101,18 +102,6 @@ class ModernLabel(QLabel):
             }
         """)
 
-class CameraView(QLabel):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.setMinimumSize(640, 480)
-        self.setAlignment(Qt.AlignCenter)
-        self.setStyleSheet("""
-            QLabel {
-                background-color: #34495e;
-                border-radius: 10px;
-            }
-        """)
-
 class StatsWidget(QFrame):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -131,8 +120,15 @@ class StatsWidget(QFrame):
         layout = QVBoxLayout(self)
         self.screenshot_label = ModernLabel("Screenshots: 0")
         self.uptime_label = ModernLabel("Uptime: 00:00:00")
+        self.frames_label = ModernLabel("Frames: 0 (dropped 0)")
+        self.volume_label = ModernLabel("Volume writes: 0 (suppressed 0)")
+        self.preroll_label = ModernLabel("Pre-roll: off")
+        self.preroll_label.hide()
         layout.addWidget(self.screenshot_label)
         layout.addWidget(self.uptime_label)
+        layout.addWidget(self.frames_label)
+        layout.addWidget(self.volume_label)
+        layout.addWidget(self.preroll_label)
 
 # Main application class
 class GestureControlApp(QMainWindow):
@@ -147,42 +143,100 @@ class GestureControlApp(QMainWindow):
         self.available_cameras = []
         self.screenshot_count = 0
         self.start_time = time.time()
-        self.last_clap_time = 0
-        self.clap_threshold = 0.3
         self.last_gesture = None
-        self.virtual_keyboard_active = False
-        self.mouse_control_active = False
-        self.exercise_mode_active = False
         self.current_profile = "default"
         self.current_theme = "light"
+        self.cameras = None
+        self.capture_size = (640, 480)
+        self.fps_limit = 30
+        self.web_ui = None
+        self.frame_latency = 0.0
+        self.preview_result = None
         
-        # MediaPipe hand detection
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5
-        )
+        # Captured, mirrored and scaled frames all come from one pool and are
+        # passed between stages by reference, the preview keeps shown_frame
+        self.frame_pool = FramePool()
+        self.shown_frame = None
         
-        # Volume control
-        devices = AudioUtilities.GetSpeakers()
-        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-        self.volume = interface.QueryInterface(IAudioEndpointVolume)
+        # Landmarks and mode banners on the preview: 'preview' draws them after
+        # scaling the frame down to the preview size, 'frame' onto the full
+        # camera frame, None turns them off
+        self.overlay_mode = 'preview'
+        self.overlays = OverlayRenderer()
         
-        # Spotify API
-        self.spotify = None
-        self.init_spotify()
+        # Preview refresh rate, lower than the camera rate keeps the preview cheap
+        self.preview_fps = 15
+        self.use_opengl_preview = False
         
-        # Pygame sound effects
-        pygame.mixer.init()
-        self.load_sound_effects()
+        # Several cameras at once: each gets its own inference process, together
+        # they may use inference_cpu_budget cores (None = all but one)
+        self.inference_cpu_budget = None
+        self.max_inference_fps = 30.0
+        
+        # Run inference every interval frames and extrapolate landmarks in
+        # between, sooner when hands move fast. None runs it on every frame.
+        self.predictive_tracking = {
+            'interval': 2,
+            'max_speed': 1.5,
+            'max_error': 0.03
+        }
+        
+        # Crop around the previous hands instead of feeding the full frame,
+        # set to None to always run full-frame detection
+        self.adaptive_inference = {
+            'margin': 0.3,
+            'roi_size': 256,
+            'detection_scale': 0.5
+        }
+        
+        # Integrations load on first use or during warm-up after the window is shown
+        self.backends = BackendRegistry()
+        self.register_backends()
+        
+        # Cached desktop geometry for mouse control and the virtual keyboard
+        self.screen_geometry_cache = ScreenGeometry(self.desktop_geometry)
+        self.watch_screens()
         
         # Profile management
-        self.profiles = self.load_profiles()
+        with self.backends.timed('profiles'):
+            self.profiles = self.load_profiles()
+        
+        # Gesture logic, actions are carried out through this window
+        self.gestures = GesturePipeline(self, self.profiles[self.current_profile])
         
         # UI setup
-        self.setup_ui()
+        with self.backends.timed('ui'):
+            self.setup_ui()
+        
+        # Feedback messages, a few reused labels instead of one per message
+        self.toasts = ToastManager(self, pool_size=3, duration=2.0)
+        
+        # Screenshots are grabbed and encoded in the background
+        self.screenshot_writer = ScreenshotWriter(
+            directory="screenshots",
+            image_format='png',  # 'png', 'jpeg' or 'webp'
+            quality=90,
+            png_compress_level=1,
+            max_pending=4
+        )
+        self.screenshot_writer.saved.connect(self.on_screenshot_saved)
+        self.screenshot_writer.overflow.connect(self.on_screenshot_overflow)
+        self.screenshot_writer.start()
+        
+        # Optional pre-roll: a clap also saves the last few seconds of the screen.
+        # Toggled with the "Screen Pre-roll" button, CLAPATHON_PREROLL=1 starts it.
+        self.preroll = ScreenPreroll(
+            directory="screenshots",
+            fps=2.0,
+            scale=0.5,
+            quality=70,
+            max_bytes=64 * 1024 * 1024,
+            max_seconds=10.0,
+            clip_format='burst'  # 'burst' or 'gif'
+        )
+        self.preroll.burst_saved.connect(self.on_preroll_saved)
+        if os.environ.get('CLAPATHON_PREROLL') == '1':
+            self.toggle_preroll()
         
         # Camera refresh timer
         self.timer = QTimer()
@@ -193,28 +247,237 @@ class GestureControlApp(QMainWindow):
         self.stats_timer.timeout.connect(self.update_stats)
         self.stats_timer.start(1000)
         
-        # Scan cameras
-        self.refresh_cameras()
+        # Scan cameras, the cached list shows up immediately and is revalidated
+        # in the background
+        self.discovery = CameraDiscovery(cache_path="camera_cache.json", max_index=10)
+        self.discovery.cameras_changed.connect(self.on_cameras_changed)
+        with self.backends.timed('camera_discovery'):
+            self.discovery.start()
+        # Camera hot-plug messages on Windows, see nativeEvent
+        self.discovery.register_window(int(self.winId()))
+        
+        # Span tracing, toggled with Ctrl+Shift+T. CLAPATHON_TRACE=1 starts it
+        # right away, CLAPATHON_TRACE_SAMPLE_HZ adds Python stack samples.
+        self.trace_sample_rate = float(os.environ.get('CLAPATHON_TRACE_SAMPLE_HZ', 0)) or None
+        self.trace_shortcut = QShortcut(QKeySequence("Ctrl+Shift+T"), self)
+        self.trace_shortcut.activated.connect(self.toggle_tracing)
+        if os.environ.get('CLAPATHON_TRACE') == '1':
+            tracer.start(self.trace_sample_rate)
+        
+        # Telemetry, scraped from http://127.0.0.1:9464/metrics and snapshotted
+        # to metrics.json every 10 seconds
+        self.metrics = MetricsRegistry()
+        self.setup_metrics()
+        self.metrics_server = MetricsServer(self.metrics, port=9464)
+        self.metrics_server.start()
+        self.metrics_snapshots = MetricsSnapshotWriter(self.metrics, "metrics.json", interval=10.0)
+        self.metrics_snapshots.start()
+        
+        # Warm up the rest once the event loop runs, i.e. after the window is shown
+        QTimer.singleShot(0, self.warm_up_backends)
 
-    def init_spotify(self):
+    def register_backends(self):
+        # MediaPipe hand detection runs in a worker process
+        self.backends.register('inference', self.create_inference,
+                               close=lambda worker: worker.stop(), warm='thread')
+        self.backends.register('keyboard', lambda: importlib.import_module('keyboard'),
+                               warm='thread')
+        # The audio endpoint is a COM object, create it on the GUI thread
+        self.backends.register('volume', self.create_volume_actuator, warm='main')
+        # Only needed once mouse control is switched on
+        self.backends.register('cursor', self.create_cursor_actuator,
+                               close=lambda cursor: cursor.stop())
+        # Media commands go through a dispatcher thread, Spotify's OAuth flow only
+        # runs when the first command is sent
+        self.backends.register('media', self.create_media_dispatcher,
+                               close=lambda media: media.stop())
+
+    def toggle_tracing(self):
+        if not tracer.enabled:
+            tracer.start(self.trace_sample_rate)
+            self.show_feedback("Tracing started", "#8e44ad")
+            return
+        tracer.stop()
+        path = os.path.join("traces", datetime.datetime.now().strftime("trace_%Y%m%d_%H%M%S.json"))
         try:
-            self.spotify = spotipy.Spotify(auth_manager=SpotifyOAuth(
+            tracer.export(path)
+            print(f"Trace with {len(tracer)} spans saved to {path}")
+            self.show_feedback("Trace saved!", "#8e44ad")
+        except OSError as e:
+            print(f"Could not save trace: {e}")
+            self.show_feedback("Trace error!", "#c0392b")
+
+    def setup_metrics(self):
+        # Updated once per inference result in update_frame
+        self.results_processed = self.metrics.counter(
+            'results_processed_total', "Inference results evaluated for gestures")
+        self.inference_seconds = self.metrics.histogram(
+            'inference_seconds', "Hand detection time per frame")
+        self.latency_seconds = self.metrics.histogram(
+            'capture_to_action_seconds', "Time from frame capture to gesture evaluation")
+        self.hands_per_frame = self.metrics.histogram(
+            'hands_per_frame', "Hands detected per processed frame", buckets=(0, 1, 2, 3, 4))
+        
+        # Everything else is read from existing counters when scraped
+        self.metrics.collect('frames_captured_total', "Frames read from the camera",
+                             lambda: self.camera_counts(lambda c: c.capture.frames_captured),
+                             kind='counter')
+        self.metrics.collect('frames_dropped_total', "Frames replaced before anyone read them",
+                             lambda: self.camera_counts(lambda c: c.capture.frames_dropped),
+                             kind='counter')
+        self.metrics.collect('frames_skipped_total', "Frames not sent to inference",
+                             lambda: self.camera_counts(
+                                 lambda c: c.inference.frames_skipped + c.budget_skipped),
+                             kind='counter')
+        self.metrics.collect('frames_processed_total', "Frames run through hand detection",
+                             lambda: self.camera_counts(lambda c: c.inference.frames_processed),
+                             kind='counter')
+        self.metrics.collect('gestures_fired_total', "Gestures fired, by type",
+                             lambda: [({'gesture': name}, count)
+                                      for name, count in list(self.gestures.gesture_counts.items())],
+                             kind='counter')
+        self.metrics.collect('actuator_calls_total', "Actuator calls, by actuator and result",
+                             self.actuator_calls, kind='counter')
+        self.metrics.collect('queue_depth', "Items waiting in background queues",
+                             self.queue_depths)
+        self.metrics.collect('notifications_total', "Feedback messages shown or merged",
+                             lambda: [({'result': 'shown'}, self.toasts.shown),
+                                      ({'result': 'merged'}, self.toasts.merged)],
+                             kind='counter')
+
+    def camera_counts(self, read):
+        cameras = self.cameras
+        if cameras is None:
+            return []
+        return [({'camera': str(channel.camera_id)}, read(channel))
+                for channel in list(cameras.channels)]
+
+    def actuator_calls(self):
+        calls = [
+            ({'actuator': 'screenshot', 'result': 'written'}, self.screenshot_writer.written),
+            ({'actuator': 'screenshot', 'result': 'dropped'}, self.screenshot_writer.dropped),
+        ]
+        if self.backends.loaded('volume'):
+            volume = self.volume_actuator
+            calls.append(({'actuator': 'volume', 'result': 'written'}, volume.writes))
+            calls.append(({'actuator': 'volume', 'result': 'suppressed'}, volume.suppressed))
+            calls.append(({'actuator': 'volume', 'result': 'error'}, volume.errors))
+        if self.backends.loaded('cursor'):
+            cursor = self.cursor_actuator
+            calls.append(({'actuator': 'cursor', 'result': 'moved'}, cursor.moves))
+            calls.append(({'actuator': 'cursor', 'result': 'clicked'}, cursor.clicks))
+            calls.append(({'actuator': 'cursor', 'result': 'error'}, cursor.errors))
+        if self.backends.loaded('media'):
+            media = self.media
+            calls.append(({'actuator': 'media', 'result': 'sent'}, media.sent))
+            calls.append(({'actuator': 'media', 'result': 'coalesced'}, media.coalesced))
+            calls.append(({'actuator': 'media', 'result': 'failed'}, media.failed))
+        return calls
+
+    def queue_depths(self):
+        depths = [({'queue': 'screenshots'}, self.screenshot_writer.pending)]
+        if self.backends.loaded('inference'):
+            depths.append(({'queue': 'inference'}, self.inference.in_flight))
+        if self.backends.loaded('media'):
+            depths.append(({'queue': 'media'}, self.media.stats()['pending']))
+        return depths
+
+    def warm_up_backends(self):
+        # Whichever warm-up finishes last, background or GUI thread, prints
+        # the startup report
+        remaining = ['thread', 'main']
+        lock = threading.Lock()
+
+        def finished(kind):
+            with lock:
+                remaining.remove(kind)
+                if remaining:
+                    return
+            self.backends.print_report()
+
+        if self.backends.pending_warm_up('thread'):
+            self.backends.warm_up_in_background(on_done=lambda: finished('thread'))
+        else:
+            finished('thread')
+
+        def warm_up_main():
+            for name in self.backends.pending_warm_up('main'):
+                self.backends.get(name)
+            finished('main')
+
+        QTimer.singleShot(0, warm_up_main)
+
+    @property
+    def inference(self):
+        return self.backends.get('inference')
+
+    @property
+    def volume_actuator(self):
+        return self.backends.get('volume')
+
+    @property
+    def cursor_actuator(self):
+        return self.backends.get('cursor')
+
+    @property
+    def media(self):
+        return self.backends.get('media')
+
+    def create_inference(self):
+        worker = InferenceWorker(self.hands_config(self.profiles[self.current_profile]),
+                                 adaptive=self.adaptive_inference,
+                                 pool_size=max(4, len(self.profiles)))
+        self.start_inference(worker)
+        return worker
+
+    def start_inference(self, worker):
+        worker.start()
+        # Detectors for the other profiles load in the background, switching is instant
+        worker.prewarm([self.hands_config(profile) for profile in self.profiles.values()])
+
+    def hands_config(self, profile):
+        # Full detector configuration of a profile, nothing is inherited from
+        # the previously active one
+        return {
+            'static_image_mode': False,
+            'max_num_hands': profile.get('max_num_hands', 2),
+            'min_detection_confidence': profile['gesture_sensitivity'],
+            'min_tracking_confidence': profile.get('min_tracking_confidence', 0.5)
+        }
+
+    def create_volume_actuator(self):
+        # Volume control, smoothed and rate limited instead of a write every frame
+        return VolumeActuator(
+            create_volume_backend(),  # pycaw, or pactl on Linux
+            smoothing='one_euro',
+            dead_band=0.02,
+            max_rate=10.0
+        )
+
+    def create_cursor_actuator(self):
+        # Mouse control, the cursor glides on its own thread at display refresh rate
+        cursor = CursorActuator(
+            PyAutoGuiCursorBackend(),
+            rate=QApplication.primaryScreen().refreshRate() or 60.0,
+            smoothing=0.35
+        )
+        cursor.start()
+        return cursor
+
+    def create_media_dispatcher(self):
+        # MEDIA_STUB_URL points media control at a local stub server instead of Spotify
+        stub_url = os.environ.get('MEDIA_STUB_URL')
+        if stub_url:
+            backend = HttpMediaBackend(stub_url)
+        else:
+            backend = SpotifyMediaBackend(
                 client_id="YOUR_CLIENT_ID",
                 client_secret="YOUR_CLIENT_SECRET",
-                redirect_uri="http://localhost:8888/callback",
-                scope="user-modify-playback-state user-read-playback-state"
-            ))
-        except Exception as e:
-            print(f"Could not connect to Spotify: {e}")
-
-    def load_sound_effects(self):
-        try:
-            pygame.mixer.init()
-            self.sounds = {}
-            print("Sound system initialized (sound effects disabled)")
-        except Exception as e:
-            print(f"Could not initialize sound system: {e}")
-            self.sounds = {}
+                redirect_uri="http://localhost:8888/callback"
+            )
+        dispatcher = MediaDispatcher(backend, coalesce_window=0.3, max_retries=3)
+        dispatcher.start()
+        return dispatcher
 
     def load_profiles(self):
         try:
@@ -262,7 +525,15 @@ class GestureControlApp(QMainWindow):
         self.camera_button = ModernButton("Start Camera")
         self.camera_button.clicked.connect(self.toggle_camera)
         
+        # Extra angles, e.g. a top-down camera next to the front one
+        self.extra_cameras_label = QLabel("Additional cameras")
+        self.extra_cameras_label.setStyleSheet("color: white;")
+        self.extra_cameras_list = QListWidget()
+        self.extra_cameras_list.setMaximumHeight(80)
+        
         camera_layout.addWidget(self.camera_combo)
+        camera_layout.addWidget(self.extra_cameras_label)
+        camera_layout.addWidget(self.extra_cameras_list)
         camera_layout.addWidget(self.camera_button)
         
         # Mode options
@@ -279,9 +550,13 @@ class GestureControlApp(QMainWindow):
         self.exercise_button = ModernButton("Exercise Mode")
         self.exercise_button.clicked.connect(self.toggle_exercise_mode)
         
+        self.preroll_button = ModernButton("Screen Pre-roll")
+        self.preroll_button.clicked.connect(self.toggle_preroll)
+        
         modes_layout.addWidget(self.keyboard_button)
         modes_layout.addWidget(self.mouse_button)
         modes_layout.addWidget(self.exercise_button)
+        modes_layout.addWidget(self.preroll_button)
         
         # Profile selection
         profile_group = QGroupBox("Profile")
@@ -313,7 +588,7 @@ class GestureControlApp(QMainWindow):
         content_layout = QVBoxLayout(content_area)
         
         # Camera view
-        self.camera_view = CameraView()
+        self.camera_view = create_camera_view(self.use_opengl_preview, self.preview_fps)
         
         # Status bar
         status_bar = QFrame()
@@ -347,260 +622,382 @@ class GestureControlApp(QMainWindow):
         layout.addWidget(content_area)
 
     def refresh_cameras(self):
-        self.available_cameras = []
-        self.camera_combo.clear()
+        # Probe every index again in the background
+        self.discovery.rescan()
+
+    def on_cameras_changed(self, cameras):
+        self.available_cameras = [camera['index'] for camera in cameras]
         
-        # Check camera count
-        max_cameras = 10  # Check maximum 10 cameras
-        for index in range(max_cameras):
-            try:
-                cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)  # Use DirectShow
-                if cap.isOpened():
-                    ret, _ = cap.read()
-                    if ret:
-                        self.available_cameras.append(index)
-                        self.camera_combo.addItem(f"Camera {index}")
-                cap.release()
-            except Exception as e:
-                print(f"Error checking camera {index}: {e}")
+        # Repopulate without triggering change_camera
+        checked = set(self.checked_extra_cameras())
+        self.extra_cameras_list.clear()
+        self.camera_combo.blockSignals(True)
+        self.camera_combo.clear()
+        for camera in cameras:
+            name = f"Camera {camera['index']} ({camera['width']}x{camera['height']})"
+            self.camera_combo.addItem(name)
+            item = QListWidgetItem(name)
+            item.setData(Qt.UserRole, camera['index'])
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if camera['index'] in checked else Qt.Unchecked)
+            self.extra_cameras_list.addItem(item)
         
         if not self.available_cameras:
             print("No cameras found!")
             self.camera_combo.addItem("No camera")
         else:
             print(f"{len(self.available_cameras)} cameras found")
+            if self.current_camera in self.available_cameras:
+                self.camera_combo.setCurrentIndex(
+                    self.available_cameras.index(self.current_camera))
+            else:
+                self.current_camera = self.available_cameras[0]
+        self.camera_combo.blockSignals(False)
+        
+        if self.web_ui is not None:
+            self.web_ui.bridge.cameraListChanged.emit([
+                {'id': camera['index'], 'name': f"Camera {camera['index']}",
+                 'resolution': {'width': camera['width'], 'height': camera['height']}}
+                for camera in cameras])
+
+    def enable_web_ui(self):
+        # templates/index.html as the front end, see webui.py
+        self.web_ui = WebUi(self)
+        self.on_cameras_changed(self.discovery.camera_list())
+        return self.web_ui
+
+    def select_camera(self, index):
+        # index is the camera's device index, not its position in the list
+        if index in self.available_cameras:
+            self.camera_combo.setCurrentIndex(self.available_cameras.index(index))
+
+    def apply_settings(self, settings):
+        # Settings saved in the web UI, see webui.parse_settings
+        if self.web_ui is not None:
+            self.web_ui.preview.quality = settings['preview_quality']
+        
+        # Detector confidence is part of the active profile
+        profile = self.profiles[self.current_profile]
+        profile['gesture_sensitivity'] = settings['confidence']
+        self.inference.configure(**self.hands_config(profile))
+        if self.cameras is not None:
+            self.cameras.configure(**self.hands_config(profile))
+        
+        # Resolution and frame rate need the cameras reopened
+        capture_changed = (settings['resolution'] != self.capture_size
+                           or settings['fps_limit'] != self.fps_limit)
+        self.capture_size = settings['resolution']
+        self.fps_limit = settings['fps_limit']
+        if capture_changed and self.camera_active:
+            self.toggle_camera()
+            self.toggle_camera()
+
+    def checked_extra_cameras(self):
+        return [self.extra_cameras_list.item(row).data(Qt.UserRole)
+                for row in range(self.extra_cameras_list.count())
+                if self.extra_cameras_list.item(row).checkState() == Qt.Checked]
+
+    def nativeEvent(self, event_type, message):
+        # Camera hot-plug notifications on Windows
+        if event_type == b"windows_generic_MSG":
+            try:
+                msg = ctypes.wintypes.MSG.from_address(int(message))
+                self.discovery.handle_native_event(msg.message, msg.wParam)
+            except Exception as e:
+                print(f"Error handling device change: {e}")
+        return super().nativeEvent(event_type, message)
 
     def change_camera(self, index):
-        if self.camera_active:
+        if not 0 <= index < len(self.available_cameras):
+            return
+        was_active = self.camera_active
+        if was_active:
             self.toggle_camera()  # Turn off current camera
         self.current_camera = self.available_cameras[index]
-        if self.camera_active:
+        if was_active:
             self.toggle_camera()  # Turn on new camera
         print(f"Camera {self.current_camera} selected")
 
     def toggle_camera(self):
         if not self.camera_active:
             try:
-                self.cap = cv2.VideoCapture(self.current_camera, cv2.CAP_DSHOW)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                
-                if not self.cap.isOpened():
-                    raise Exception("Could not open camera!")
+                # Every camera captures on its own thread and runs inference in its
+                # own process, the timer only picks up the newest results
+                self.cameras = self.create_camera_set()
+                self.cameras.start()
+                self.discovery.busy = set(self.cameras.camera_ids)
                 
                 self.camera_active = True
-                self.timer.start(30)
+                self.timer.start(max(10, int(1000 / self.fps_limit)))
                 self.camera_button.setText("Stop Camera")
                 self.camera_status.setText("Camera: On")
+                if self.web_ui is not None:
+                    self.web_ui.bridge.cameraStatusChanged.emit(True)
                 self.play_sound('gesture')
             except Exception as e:
                 print(f"Error starting camera: {e}")
+                # Nothing of a half-started camera set may stay around
+                self.timer.stop()
+                if self.cameras is not None:
+                    self.cameras.stop()
+                    self.cameras = None
+                self.discovery.busy = set()
+                self.camera_active = False
                 self.show_feedback("Camera error!", "#c0392b")
                 return
         else:
             try:
                 self.timer.stop()
-                if hasattr(self, 'cap'):
-                    self.cap.release()
+                if self.cameras is not None:
+                    self.cameras.stop()
+                    self.cameras = None
+                self.discovery.busy = set()
+                self.preview_result = None
                 self.camera_active = False
                 self.camera_button.setText("Start Camera")
                 self.camera_status.setText("Camera: Off")
+                if self.web_ui is not None:
+                    self.web_ui.bridge.cameraStatusChanged.emit(False)
                 self.camera_view.clear()
+                if self.shown_frame is not None:
+                    self.shown_frame.release()
+                    self.shown_frame = None
+                self.frame_pool.clear()
                 self.play_sound('gesture')
             except Exception as e:
                 print(f"Error stopping camera: {e}")
 
+    def create_camera_set(self):
+        if not self.inference.running:
+            # The shared worker died and stopped the last session, replace it
+            self.inference.stop()
+            self.start_inference(self.inference)
+        # The selected camera comes first and shares the pre-warmed inference worker
+        channels = []
+        try:
+            channels.append(CameraChannel(self.current_camera,
+                                          self.create_capture(self.current_camera),
+                                          self.inference, owns_inference=False,
+                                          predictor=self.create_predictor(),
+                                          on_inference=self.inference_seconds.observe))
+            config = self.hands_config(self.profiles[self.current_profile])
+            for index in self.checked_extra_cameras():
+                if index == self.current_camera:
+                    continue
+                worker = InferenceWorker(config, adaptive=self.adaptive_inference, pool_size=2)
+                worker.start()
+                try:
+                    capture = self.create_capture(index)
+                except Exception:
+                    worker.stop()
+                    raise
+                channels.append(CameraChannel(index, capture, worker,
+                                              predictor=self.create_predictor(),
+                                              on_inference=self.inference_seconds.observe))
+            return CameraSet(channels, cpu_budget=self.inference_cpu_budget,
+                             max_inference_fps=self.max_inference_fps,
+                             max_hands=config['max_num_hands'])
+        except Exception:
+            # Stop the workers of the cameras built so far
+            for channel in channels:
+                channel.stop()
+            raise
+
+    def create_predictor(self):
+        if self.predictive_tracking is None:
+            return None
+        # Sized for every profile, switching profiles keeps the channels
+        max_hands = max(self.hands_config(profile)['max_num_hands']
+                        for profile in self.profiles.values())
+        return LandmarkPredictor(max_hands=max_hands, **self.predictive_tracking)
+
+    def create_capture(self, index):
+        # The camera delivers 30 fps, the governor hands on at most fps_limit of them
+        width, height = self.capture_size
+        return CameraCapture(index, width, height, 30, fps_limit=self.fps_limit,
+                             api_preference=default_api_preference(), pool=self.frame_pool)
+
+    @tracer.traced('update_frame')
     def update_frame(self):
-        if not hasattr(self, 'cap') or not self.cap.isOpened():
-            self.show_feedback("Camera connection lost!", "#c0392b")
+        if self.cameras is None or not self.cameras.running:
+            primary = self.cameras.primary if self.cameras is not None else None
+            if primary is not None and not primary.inference.running:
+                # Starting the camera again starts a fresh worker
+                print(f"Hand tracking stopped: {primary.error}")
+                self.show_feedback("Hand tracking stopped!", "#c0392b")
+            else:
+                if primary is not None and primary.error:
+                    print(f"Error capturing frame: {primary.error}")
+                self.show_feedback("Camera connection lost!", "#c0392b")
             self.toggle_camera()  # Turn off camera
             return
             
         try:
-            ret, frame = self.cap.read()
-            if not ret or frame is None:
-                raise Exception("Could not capture frame!")
+            # Never block the GUI thread waiting for a camera. Hand detection is
+            # skipped while a worker is still busy or over its CPU budget.
+            now = time.perf_counter()
+            with tracer.span('cameras.step'):
+                frame, fused = self.cameras.step(now)
+            
+            if fused is not None:
+                # Gesture detection, once per fused result of all cameras
+                with tracer.span('gestures.process', 'gesture'):
+                    self.gestures.process(fused.landmarks, fused.captured_at)
                 
-            # Flip the frame
-            frame = cv2.flip(frame, 1)
+                # Capture-to-action latency of this result
+                self.frame_latency = now - fused.captured_at
+                self.results_processed.inc()
+                self.latency_seconds.observe(self.frame_latency)
+                self.hands_per_frame.observe(len(fused.landmarks))
             
-            # Hand detection
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.hands.process(rgb_frame)
+            # The preview shows the primary camera with its own landmarks
+            self.preview_result = self.cameras.primary.result
             
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    # Draw landmarks
-                    mp_drawing.draw_landmarks(
-                        frame,
-                        hand_landmarks,
-                        mp_hands.HAND_CONNECTIONS,
-                        mp_drawing_styles.get_default_hand_landmarks_style(),
-                        mp_drawing_styles.get_default_hand_connections_style()
-                    )
-                    
-                    # Gesture detection
-                    if len(results.multi_hand_landmarks) == 2:
-                        self.process_two_hand_gesture(results.multi_hand_landmarks)
-                    else:
-                        self.process_single_hand_gesture(hand_landmarks)
+            # Volume writes held back by the rate limit
+            if self.backends.loaded('volume'):
+                self.volume_actuator.flush()
             
-            # Active modes
-            if self.virtual_keyboard_active:
-                cv2.putText(frame, "Virtual Keyboard Active", (10, 30),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            # Nothing left to do until the preview is due again
+            if frame is None:
+                return
+            if not self.camera_view.wants_frame():
+                frame.release()
+                return
             
-            if self.mouse_control_active:
-                cv2.putText(frame, "Mouse Control Active", (10, 60),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            # Landmarks and mode banners
+            if self.overlay_mode is not None:
+                with tracer.span('preview.draw'):
+                    frame = self.draw_overlays(frame)
             
-            if self.exercise_mode_active:
-                cv2.putText(frame, "Exercise Mode Active", (10, 90),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            # Hand the BGR frame to the preview, scaled while painting
+            with tracer.span('preview.show'):
+                self.camera_view.show_frame(frame.array)
+                if self.web_ui is not None:
+                    self.web_ui.push_frame(frame.array)
             
-            # Send frame to Qt label
-            h, w, ch = frame.shape
-            bytes_per_line = ch * w
-            qt_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            qt_image = qt_image.rgbSwapped()
-            self.camera_view.setPixmap(QPixmap.fromImage(qt_image).scaled(
-                self.camera_view.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            # The view paints from this buffer until the next one replaces it
+            if self.shown_frame is not None:
+                self.shown_frame.release()
+            self.shown_frame = frame
                 
         except Exception as e:
             print(f"Error processing frame: {e}")
             self.show_feedback("Camera error!", "#c0392b")
 
-    def process_two_hand_gesture(self, hand_landmarks):
-        # Two hand gesture detection
-        hand1 = hand_landmarks[0].landmark
-        hand2 = hand_landmarks[1].landmark
-        
-        # Clap detection
-        distance = ((hand1[9].x - hand2[9].x) ** 2 + 
-                   (hand1[9].y - hand2[9].y) ** 2) ** 0.5
-        
-        if distance < self.clap_threshold:
-            current_time = time.time()
-            if current_time - self.last_clap_time > 1.0:
-                self.take_screenshot()
-                self.last_clap_time = current_time
+    def draw_overlays(self, frame):
+        # Takes over the frame buffer and returns the one to show, a scaled
+        # copy in 'preview' mode
+        hands = self.preview_result.landmarks if self.preview_result is not None else ()
+        banners = []
+        if self.gestures.virtual_keyboard_active:
+            banners.append(("Virtual Keyboard Active", (10, 30)))
+        if self.gestures.mouse_control_active:
+            banners.append(("Mouse Control Active", (10, 60)))
+        if self.gestures.exercise_mode_active:
+            banners.append(("Exercise Mode Active", (10, 90)))
         
-        # Virtual keyboard control
-        if self.virtual_keyboard_active:
-            self.handle_virtual_keyboard(hand1, hand2)
-        
-        # Volume control
-        self.handle_volume_control(hand1, hand2)
+        if self.overlay_mode == 'preview':
+            height, width = frame.shape[:2]
+            size = self.camera_view.display_size(width, height)
+            if size[0] < width and size[1] < height:
+                scaled = self.frame_pool.acquire((size[1], size[0], 3))
+                self.overlays.render(frame.array, hands, banners, size, out=scaled.array)
+                frame.release()
+                return scaled
+        self.overlays.render(frame.array, hands, banners)
+        return frame
 
-    def process_single_hand_gesture(self, hand_landmarks):
-        # Single hand gesture detection
-        landmarks = hand_landmarks.landmark
-        
-        # Mouse control
-        if self.mouse_control_active:
-            self.handle_mouse_control(landmarks)
-        
-        # Shortcut based on finger count
-        finger_count = self.count_fingers(landmarks)
-        self.handle_finger_shortcuts(finger_count)
-        
-        # Exercise mode controls
-        if self.exercise_mode_active:
-            self.handle_exercise_tracking(landmarks)
+    def take_screenshot(self):
+        # Grab and save happen on the writer thread
+        self.screenshot_writer.request()
+        if self.preroll.running:
+            self.preroll.save_burst()
 
-    def handle_virtual_keyboard(self, hand1, hand2):
-        # Virtual keyboard control
-        distance = ((hand1[8].x - hand2[8].x) ** 2 + 
-                   (hand1[8].y - hand2[8].y) ** 2) ** 0.5
-        
-        if distance < 0.1:  # Fingers are close
-            avg_y = (hand1[8].y + hand2[8].y) / 2
-            avg_x = (hand1[8].x + hand2[8].x) / 2
-            
-            # Convert screen coordinates
-            screen_x = int(avg_x * pyautogui.size().width)
-            screen_y = int(avg_y * pyautogui.size().height)
-            
-            # Virtual key press
-            key = self.get_virtual_key(screen_x, screen_y)
-            if key:
-                keyboard.press_and_release(key)
-                self.play_sound('gesture')
+    def on_screenshot_saved(self, filename):
+        self.screenshot_count += 1
+        self.stats_widget.screenshot_label.setText(f"Screenshots: {self.screenshot_count}")
+        self.play_sound('screenshot')
+        if self.web_ui is not None:
+            self.web_ui.bridge.screenshotTaken.emit()
 
-    def handle_mouse_control(self, landmarks):
-        # Mouse control
-        screen_w, screen_h = pyautogui.size()
-        index_x = int(landmarks[8].x * screen_w)
-        index_y = int(landmarks[8].y * screen_h)
-        
-        # Move cursor
-        pyautogui.moveTo(index_x, index_y, duration=0.1)
-        
-        # Click control
-        if landmarks[4].y > landmarks[8].y:  # Thumb is above index finger
-            pyautogui.click()
-            self.play_sound('gesture')
+    def toggle_preroll(self):
+        # Keeps the last seconds of the screen in memory while on
+        if self.preroll.running:
+            self.preroll.stop()
+            self.stats_widget.preroll_label.hide()
+        else:
+            self.preroll.start()
+            self.stats_widget.preroll_label.setText("Pre-roll: on")
+            self.stats_widget.preroll_label.show()
+        self.preroll_button.setStyleSheet("""
+            QPushButton {
+                background-color: """ + ("#27ae60" if self.preroll.running else "#2ecc71") + """;
+                border: none;
+                color: white;
+                padding: 10px 20px;
+                border-radius: 5px;
+                font-size: 14px;
+            }
+        """)
+        self.show_feedback(f"Screen pre-roll {'on' if self.preroll.running else 'off'}", "#2980b9")
 
-    def handle_volume_control(self, hand1, hand2):
-        # Volume control
-        y_diff = abs(hand1[8].y - hand2[8].y)
-        volume_level = 1 - min(y_diff, 0.5) * 2  # 0-1 range
-        
+    def on_preroll_saved(self, path, frames):
+        print(f"Saved {frames} pre-roll frames to {path}")
+
+    def on_screenshot_overflow(self, dropped):
+        print(f"Screenshot queue full, {dropped} screenshots dropped")
+        self.show_feedback("Screenshot skipped!", "#c0392b")
+
+    def press_key(self, key):
+        self.backends.get('keyboard').press_and_release(key)
+
+    def set_volume(self, level):
         # Set system volume level
-        self.volume.SetMasterVolumeLevelScalar(volume_level, None)
-
-    def handle_finger_shortcuts(self, finger_count):
-        # Shortcut based on finger count
-        shortcuts = self.profiles[self.current_profile]['shortcuts']
-        if str(finger_count) in shortcuts:
-            command = shortcuts[str(finger_count)]
-            if command.startswith('key:'):
-                keyboard.press_and_release(command[4:])
-            elif command.startswith('media:'):
-                self.control_media(command[6:])
-            self.play_sound('gesture')
-
-    def handle_exercise_tracking(self, landmarks):
-        # Exercise tracking
-        wrist_y = landmarks[0].y
-        shoulder_threshold = 0.3
-        
-        if wrist_y < shoulder_threshold:
-            self.gesture_status.setText("Gesture: Raise Hand")
-        else:
-            self.gesture_status.setText("Gesture: Sit Up")
+        self.volume_actuator.update(level)
 
-    def control_media(self, command):
-        # Media control
-        if self.spotify:
-            try:
-                if command == 'play':
-                    self.spotify.start_playback()
-                elif command == 'pause':
-                    self.spotify.pause_playback()
-                elif command == 'next':
-                    self.spotify.next_track()
-                elif command == 'previous':
-                    self.spotify.previous_track()
-            except Exception as e:
-                print(f"Spotify control error: {e}")
+    def set_volume_immediately(self, level):
+        # Manual changes skip the gesture smoothing
+        self.volume_actuator.set_immediately(level)
 
-    def take_screenshot(self):
-        # Take screenshot
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"screenshots/screenshot_{timestamp}.png"
-        
-        # Check directory
-        os.makedirs("screenshots", exist_ok=True)
-        
-        # Take screenshot
-        screen = pyautogui.screenshot()
-        screen.save(filename)
-        
-        self.screenshot_count += 1
-        self.stats_widget.screenshot_label.setText(f"Screenshots: {self.screenshot_count}")
-        self.play_sound('screenshot')
+    def move_cursor(self, x, y):
+        self.cursor_actuator.move_to(x, y)
+
+    def click(self):
+        self.cursor_actuator.click()
+
+    def show_gesture(self, text):
+        self.gesture_status.setText(f"Gesture: {text}")
+        if self.web_ui is not None:
+            self.web_ui.bridge.gestureTextChanged.emit(text)
+
+    def screen_geometry(self):
+        return self.screen_geometry_cache.get()
+
+    def desktop_geometry(self):
+        # Bounding box of all monitors
+        rect = QApplication.primaryScreen().virtualGeometry()
+        return rect.x(), rect.y(), rect.width(), rect.height()
+
+    def watch_screens(self):
+        # Only look up the screen layout again when it actually changes
+        app = QApplication.instance()
+        app.screenAdded.connect(self.on_screen_added)
+        app.screenRemoved.connect(self.on_screens_changed)
+        app.primaryScreenChanged.connect(self.on_screens_changed)
+        for screen in app.screens():
+            screen.virtualGeometryChanged.connect(self.on_screens_changed)
+
+    def on_screen_added(self, screen):
+        screen.virtualGeometryChanged.connect(self.on_screens_changed)
+        self.on_screens_changed()
+
+    def on_screens_changed(self, *args):
+        self.screen_geometry_cache.invalidate()
+
+    def control_media(self, command):
+        # Media control, queued so the UI never waits on the network
+        if self.media:
+            self.media.submit(command)
 
     def update_stats(self):
         # Update stats
@@ -611,12 +1008,34 @@ class GestureControlApp(QMainWindow):
         
         self.stats_widget.uptime_label.setText(
             f"Uptime: {hours:02d}:{minutes:02d}:{seconds:02d}")
+        
+        if self.cameras is not None:
+            lines = [
+                f"Camera {camera['camera']}: {camera['capture_fps']:.1f} fps, "
+                f"inference {camera['inference_fps']:.1f} fps "
+                f"(dropped {camera['dropped']}, skipped {camera['skipped']}, "
+                f"predicted {camera['predicted']})"
+                for camera in self.cameras.stats(time.perf_counter())]
+            lines.append(f"Latency {self.frame_latency * 1000:.0f} ms")
+            self.stats_widget.frames_label.setText("\n".join(lines))
+        
+        if self.backends.loaded('volume'):
+            volume = self.volume_actuator.stats()
+            self.stats_widget.volume_label.setText(
+                f"Volume writes: {volume['writes']} (suppressed {volume['suppressed']})")
+        
+        if self.preroll.running:
+            preroll = self.preroll.stats()
+            self.stats_widget.preroll_label.setText(
+                f"Pre-roll: {preroll['frames']} frames, "
+                f"{preroll['bytes_used'] / 2**20:.1f}/{preroll['max_bytes'] / 2**20:.0f} MB, "
+                f"CPU {preroll['cpu_percent']:.1f}%")
 
     def toggle_virtual_keyboard(self):
-        self.virtual_keyboard_active = not self.virtual_keyboard_active
+        self.gestures.virtual_keyboard_active = not self.gestures.virtual_keyboard_active
         self.keyboard_button.setStyleSheet("""
             QPushButton {
-                background-color: """ + ("#27ae60" if self.virtual_keyboard_active else "#2ecc71") + """;
+                background-color: """ + ("#27ae60" if self.gestures.virtual_keyboard_active else "#2ecc71") + """;
                 border: none;
                 color: white;
                 padding: 10px 20px;
@@ -624,14 +1043,16 @@ class GestureControlApp(QMainWindow):
                 font-size: 14px;
             }
         """)
-        self.mode_status.setText(f"Mode: {'Virtual Keyboard' if self.virtual_keyboard_active else 'Normal'}")
+        self.mode_status.setText(f"Mode: {'Virtual Keyboard' if self.gestures.virtual_keyboard_active else 'Normal'}")
         self.play_sound('gesture')
 
     def toggle_mouse_control(self):
-        self.mouse_control_active = not self.mouse_control_active
+        self.gestures.mouse_control_active = not self.gestures.mouse_control_active
+        if not self.gestures.mouse_control_active and self.backends.loaded('cursor'):
+            self.cursor_actuator.reset()
         self.mouse_button.setStyleSheet("""
             QPushButton {
-                background-color: """ + ("#27ae60" if self.mouse_control_active else "#2ecc71") + """;
+                background-color: """ + ("#27ae60" if self.gestures.mouse_control_active else "#2ecc71") + """;
                 border: none;
                 color: white;
                 padding: 10px 20px;
@@ -639,14 +1060,14 @@ class GestureControlApp(QMainWindow):
                 font-size: 14px;
             }
         """)
-        self.mode_status.setText(f"Mode: {'Mouse Control' if self.mouse_control_active else 'Normal'}")
+        self.mode_status.setText(f"Mode: {'Mouse Control' if self.gestures.mouse_control_active else 'Normal'}")
         self.play_sound('gesture')
 
     def toggle_exercise_mode(self):
-        self.exercise_mode_active = not self.exercise_mode_active
+        self.gestures.exercise_mode_active = not self.gestures.exercise_mode_active
         self.exercise_button.setStyleSheet("""
             QPushButton {
-                background-color: """ + ("#27ae60" if self.exercise_mode_active else "#2ecc71") + """;
+                background-color: """ + ("#27ae60" if self.gestures.exercise_mode_active else "#2ecc71") + """;
                 border: none;
                 color: white;
                 padding: 10px 20px;
@@ -654,7 +1075,7 @@ class GestureControlApp(QMainWindow):
                 font-size: 14px;
             }
         """)
-        self.mode_status.setText(f"Mode: {'Exercise' if self.exercise_mode_active else 'Normal'}")
+        self.mode_status.setText(f"Mode: {'Exercise' if self.gestures.exercise_mode_active else 'Normal'}")
         self.play_sound('gesture')
 
     def change_profile(self, profile_name):
@@ -662,10 +1083,10 @@ class GestureControlApp(QMainWindow):
         profile = self.profiles[profile_name]
         
         # Apply profile settings
-        self.clap_threshold = profile['clap_threshold']
-        self.hands = self.mp_hands.Hands(
-            min_detection_confidence=profile['gesture_sensitivity']
-        )
+        self.gestures.apply_profile(profile)
+        self.inference.configure(**self.hands_config(profile))
+        if self.cameras is not None:
+            self.cameras.configure(**self.hands_config(profile))
         
         # Apply theme
         self.apply_theme(profile['theme'])
@@ -687,36 +1108,6 @@ class GestureControlApp(QMainWindow):
                 }
             """)
 
-    def count_fingers(self, landmarks):
-        # Calculate finger count
-        fingers = 0
-        finger_tips = [8, 12, 16, 20]  # Indices, middle, ring, and pinky finger tips
-        
-        # Thumb control
-        if landmarks[4].x < landmarks[3].x:
-            fingers += 1
-        
-        # Other fingers
-        for tip in finger_tips:
-            if landmarks[tip].y < landmarks[tip - 2].y:
-                fingers += 1
-                
-        return fingers
-
-    def get_virtual_key(self, x, y):
-        # Virtual keyboard key map
-        keyboard_layout = {
-            (0, 0): 'a', (1, 0): 's', (2, 0): 'd', (3, 0): 'f',
-            (0, 1): 'q', (1, 1): 'w', (2, 1): 'e', (3, 1): 'r',
-            (0, 2): 'z', (1, 2): 'x', (2, 2): 'c', (3, 2): 'v'
-        }
-        
-        # Divide screen into grid
-        grid_x = x // (pyautogui.size().width // 4)
-        grid_y = y // (pyautogui.size().height // 3)
-        
-        return keyboard_layout.get((grid_x, grid_y))
-
     def play_sound(self, sound_name):
         # Visual feedback instead of sound
         if sound_name == 'screenshot':
@@ -727,36 +1118,37 @@ class GestureControlApp(QMainWindow):
             self.show_feedback("Error!", "#c0392b")
 
     def show_feedback(self, message, color):
-        # Create temporary label
-        feedback = QLabel(message, self)
-        feedback.setStyleSheet(f"""
-            QLabel {{
-                background-color: {color};
-                color: white;
-                padding: 10px 20px;
-                border-radius: 5px;
-                font-size: 14px;
-            }}
-        """)
-        feedback.adjustSize()
-        
-        # Place label in center of screen
-        x = (self.width() - feedback.width()) // 2
-        feedback.move(x, 20)
-        feedback.show()
-        
-        # Remove after 2 seconds
-        QTimer.singleShot(2000, feedback.deleteLater)
+        # Repeats of a visible message only bump its counter
+        self.toasts.show(message, color)
 
     def closeEvent(self, event):
         # Clean up before closing
-        if self.camera_active:
-            self.cap.release()
+        if self.cameras is not None:
+            self.cameras.stop()
+        self.screenshot_writer.stop()
+        self.preroll.stop()
+        self.discovery.stop()
+        self.backends.close()
+        self.metrics_server.stop()
+        self.metrics_snapshots.stop()
+        if tracer.enabled:
+            self.toggle_tracing()  # Save what was recorded
         self.save_profiles()
         event.accept()
 
 if __name__ == '__main__':
+    # --web-ui shows templates/index.html instead of the widget window
+    web_ui = '--web-ui' in sys.argv
+    if web_ui:
+        register_preview_scheme()
     app = QApplication(sys.argv)
     window = GestureControlApp()
-    window.show()
+    if '--no-overlays' in sys.argv:
+        window.overlay_mode = None
+    if web_ui:
+        window.enable_web_ui().show()
+        # The window stays hidden, still run its clean-up on exit
+        app.aboutToQuit.connect(window.close)
+    else:
+        window.show()
     sys.exit(app.exec_()) 
\ No newline at end of file
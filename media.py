@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+
+from tracing import tracer
+
+MEDIA_COMMANDS = ('play', 'pause', 'next', 'previous')
+
+
+class MediaRateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limited, retry after {retry_after} s")
+        self.retry_after = retry_after
+
+
+def create_http_session(pool_size=4):
+    # One keep-alive connection pool shared by every request
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class SpotifyMediaBackend:
+    # Spotify Web API through spotipy, the client (and its OAuth flow) is only
+    # created by the first command, on the dispatcher thread
+    name = 'spotify'
+
+    def __init__(self, client_id, client_secret, redirect_uri,
+                 scope="user-modify-playback-state user-read-playback-state"):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.scope = scope
+        self.client = None
+
+    def _client(self):
+        if self.client is None:
+            import spotipy
+            from spotipy.oauth2 import SpotifyOAuth
+            self.client = spotipy.Spotify(
+                auth_manager=SpotifyOAuth(
+                    client_id=self.client_id,
+                    client_secret=self.client_secret,
+                    redirect_uri=self.redirect_uri,
+                    scope=self.scope
+                ),
+                requests_session=create_http_session(),
+                retries=0  # Retries are handled by the dispatcher
+            )
+        return self.client
+
+    def send(self, command):
+        from spotipy.exceptions import SpotifyException
+        client = self._client()
+        try:
+            if command == 'play':
+                client.start_playback()
+            elif command == 'pause':
+                client.pause_playback()
+            elif command == 'next':
+                client.next_track()
+            elif command == 'previous':
+                client.previous_track()
+        except SpotifyException as e:
+            if e.http_status == 429:
+                retry_after = (e.headers or {}).get('Retry-After', 1)
+                raise MediaRateLimited(float(retry_after)) from e
+            raise
+
+
+class HttpMediaBackend:
+    # POSTs commands to {base_url}/{command}, e.g. against
+    # benchmarks.media_stub.StubMediaServer
+    name = 'http'
+
+    def __init__(self, base_url, timeout=2.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = create_http_session()
+
+    def send(self, command):
+        response = self.session.post(f"{self.base_url}/{command}", timeout=self.timeout)
+        if response.status_code == 429:
+            raise MediaRateLimited(float(response.headers.get('Retry-After', 1)))
+        response.raise_for_status()
+
+
+class MediaDispatcher:
+    # Sends media commands from a background thread so the UI never waits on
+    # the network. Commands arriving within coalesce_window are merged (repeated
+    # next/previous become one, only the last play/pause counts), failures are
+    # retried with exponential backoff and 429 responses honour Retry-After.
+    def __init__(self, backend, coalesce_window=0.3, max_retries=3, backoff=0.5,
+                 max_pending=16):
+        self.backend = backend
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.submitted = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="media-dispatcher",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=2.0):
+        if self._thread is not None:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, command):
+        # Never blocks, returns False when the command was dropped
+        if command not in MEDIA_COMMANDS:
+            print(f"Unknown media command: {command}")
+            return False
+        try:
+            self._queue.put_nowait(command)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def stats(self):
+        return {
+            'backend': self.backend.name,
+            'submitted': self.submitted,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'pending': self._queue.qsize(),
+        }
+
+    @staticmethod
+    def coalesce(commands):
+        # Merges a batch into the commands that actually need sending
+        merged = []
+        for command in commands:
+            if merged and merged[-1] == command:
+                continue
+            if command in ('play', 'pause') and merged and merged[-1] in ('play', 'pause'):
+                merged[-1] = command
+                continue
+            merged.append(command)
+        return merged
+
+    def _collect(self, first):
+        # Gather everything arriving within the coalescing window
+        batch = [first]
+        deadline = time.perf_counter() + self.coalesce_window
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                command = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if command is None:
+                return batch, True
+            batch.append(command)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            command = self._queue.get()
+            if command is None:
+                break
+            batch, stopping = self._collect(command)
+            commands = self.coalesce(batch)
+            self.coalesced += len(batch) - len(commands)
+            for command in commands:
+                self._send(command)
+
+    def _send(self, command):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                with tracer.span('media.send', 'actuator'):
+                    self.backend.send(command)
+                self.sent += 1
+                return True
+            except MediaRateLimited as e:
+                wait = e.retry_after
+            except Exception as e:
+                print(f"Media control error: {e}")
+                wait = delay
+                delay *= 2
+            if attempt < self.max_retries:
+                time.sleep(wait)
+        self.failed += 1
+        return False
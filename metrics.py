@@ -0,0 +1,203 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds, for inference and capture-to-action latency
+LATENCY_BUCKETS = (0.005, 0.01, 0.02, 0.03, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Counter:
+    # Plain attribute add, cheap enough for the per-frame path
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        return [(self.name, (), self.value)]
+
+
+class Histogram:
+    # Cumulative-bucket histogram in the Prometheus sense, observe() is one
+    # bisect and three adds
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        samples = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            samples.append((self.name + '_bucket', (('le', repr(float(bound))),), total))
+        samples.append((self.name + '_bucket', (('le', '+Inf'),), self.count))
+        samples.append((self.name + '_sum', (), self.sum))
+        samples.append((self.name + '_count', (), self.count))
+        return samples
+
+
+class Collected:
+    # Values read from existing stats at scrape time, costs nothing per frame.
+    # collect() returns a number, or a list of (labels dict, number).
+    def __init__(self, name, help_text, kind, collect):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self):
+        try:
+            values = self.collect()
+        except Exception as e:
+            print(f"Could not collect {self.name}: {e}")
+            return []
+        if values is None:
+            return []
+        if isinstance(values, (int, float)):
+            return [(self.name, (), values)]
+        return [(self.name, tuple(sorted(labels.items())), value) for labels, value in values]
+
+
+class MetricsRegistry:
+    # Metrics for the pipeline, rendered as Prometheus text or a JSON snapshot.
+    # Updates aren't locked: a scrape may see a histogram mid-update, which is
+    # fine for monitoring and keeps the hot path free of locks.
+    def __init__(self, prefix='clapathon_'):
+        self.prefix = prefix
+        self._metrics = []
+
+    def counter(self, name, help_text):
+        return self._add(Counter(self.prefix + name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self.prefix + name, help_text, buckets))
+
+    def collect(self, name, help_text, collect, kind='gauge'):
+        return self._add(Collected(self.prefix + name, help_text, kind, collect))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        snapshot = {'time': time.time(), 'metrics': {}}
+        for metric in self._metrics:
+            snapshot['metrics'][metric.name] = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for name, labels, value in metric.samples()]
+        return snapshot
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+class MetricsServer:
+    # Serves registry.render() at http://host:port/metrics
+    def __init__(self, registry, host='127.0.0.1', port=9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._httpd = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"Could not start metrics endpoint: {e}")
+            return
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="metrics-server", daemon=True)
+        self._thread.start()
+        print(f"Metrics on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+            self._thread = None
+
+
+class MetricsSnapshotWriter:
+    # Writes registry.snapshot() as JSON every interval seconds
+    def __init__(self, registry, path="metrics.json", interval=10.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        self.write()
+
+    def write(self):
+        # Replace atomically so readers never see a half-written file
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self.registry.snapshot(), f, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not write metrics snapshot: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
@@ -0,0 +1,310 @@
+import os
+from collections import deque
+
+import cv2
+import numpy as np
+
+from inference import InferenceResult
+from landmarks import empty_hands
+from tracing import tracer
+
+
+def default_cpu_budget():
+    # Cores for hand inference, one is left for the GUI and the capture threads
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+class RateMeter:
+    # Events per second over a sliding window
+    def __init__(self, window=2.0):
+        self.window = window
+        self._times = deque()
+
+    def tick(self, now):
+        self._times.append(now)
+        self._prune(now)
+
+    def rate(self, now):
+        self._prune(now)
+        if len(self._times) < 2:
+            return 0.0
+        return (len(self._times) - 1) / max(self._times[-1] - self._times[0], 1e-6)
+
+    def _prune(self, now):
+        while self._times and now - self._times[0] > self.window:
+            self._times.popleft()
+
+
+class CameraChannel:
+    # One camera with its own capture thread and inference worker. Frames are
+    # only submitted every min_interval seconds, which is how the CPU budget
+    # is enforced. With a LandmarkPredictor, frames it doesn't need inference
+    # for get extrapolated landmarks instead. on_inference is called with the
+    # detection time of every real result, predicted ones don't have one.
+    def __init__(self, camera_id, capture, inference, owns_inference=True, predictor=None,
+                 on_inference=None):
+        self.camera_id = camera_id
+        self.capture = capture
+        self.inference = inference
+        self.owns_inference = owns_inference
+        self.predictor = predictor
+        self.on_inference = on_inference
+        self.min_interval = 0.0
+
+        self.result = None  # newest inference result of this camera
+        self.budget_skipped = 0
+        self.prediction_skipped = 0
+        self.capture_rate = RateMeter()
+        self.inference_rate = RateMeter()
+        self._last_submit = float('-inf')
+
+    @property
+    def running(self):
+        # A dead inference worker takes the camera down with it
+        return self.capture.running and self.inference.running
+
+    @property
+    def error(self):
+        if not self.inference.running:
+            return self.inference.last_error or "inference worker stopped"
+        return self.capture.error
+
+    def step(self, now):
+        # Returns (new mirrored FrameBuffer or None, new inference result or
+        # None, whether that result is predicted). The caller owns the frame
+        # and has to release it.
+        predictor = self.predictor
+        predicted = False
+        with tracer.span('inference.poll'):
+            result = self.inference.poll()
+        if result is not None:
+            self.inference_rate.tick(now)
+            if self.on_inference is not None:
+                self.on_inference(result.inference_time)
+            if predictor is not None:
+                predictor.update(result.landmarks, result.handedness, result.captured_at)
+
+        frame = None
+        packet = self.capture.read_latest()
+        if packet is not None:
+            frame_id, captured_at, raw = packet
+            with tracer.span('camera.flip'):
+                # Mirrored into a pooled buffer, the raw frame goes straight back
+                frame = self.capture.pool.acquire(raw.shape)
+                cv2.flip(raw.array, 1, dst=frame.array)
+                raw.release()
+            self.capture_rate.tick(now)
+            if predictor is not None and not predictor.should_infer():
+                self.prediction_skipped += 1
+            elif now - self._last_submit >= self.min_interval:
+                with tracer.span('inference.submit'):
+                    submitted = self.inference.submit(frame.array, frame_id, captured_at)
+                if submitted:
+                    self._last_submit = now
+                    if predictor is not None:
+                        predictor.mark_inferred()
+            else:
+                self.budget_skipped += 1
+
+            # Frames without a fresh real result get landmarks extrapolated
+            # from the newest one
+            if result is None and predictor is not None and predictor.ready:
+                with tracer.span('tracking.predict'):
+                    landmarks, handedness = predictor.predict(captured_at)
+                result = InferenceResult(frame_id, captured_at, landmarks, handedness, 0.0)
+                predicted = True
+
+        if result is not None:
+            self.result = result
+        return frame, result, predicted
+
+    def stats(self, now):
+        return {
+            'camera': self.camera_id,
+            'capture_fps': self.capture_rate.rate(now),
+            'inference_fps': self.inference_rate.rate(now),
+            'captured': self.capture.frames_captured,
+            'dropped': self.capture.frames_dropped,
+            'skipped': self.inference.frames_skipped + self.budget_skipped,
+            'predicted': self.prediction_skipped,
+        }
+
+    def stop(self):
+        self.capture.stop()
+        if self.owns_inference:
+            self.inference.stop()
+
+
+class LandmarkFusion:
+    # Merges the per-camera results that belong to the same moment. A fused
+    # result is emitted once every camera reported, or once the oldest pending
+    # result waited window seconds. Hands are merged by handedness in camera
+    # order, so the first camera wins and the others fill in hands it can't see.
+    # Predicted results never hold back real ones: a real result is only
+    # dropped when it is older than the last real result passed on.
+    def __init__(self, camera_ids, window=0.05, max_hands=2):
+        self.camera_ids = list(camera_ids)
+        self.window = window
+        self.max_hands = max_hands
+
+        self.fused = 0
+        self.partial = 0
+        self.discarded = 0
+
+        self._pending = {}
+        self._predicted = set()  # cameras whose pending result is predicted
+        self._last_time = float('-inf')  # newest real result passed on
+        self._last_predicted_time = float('-inf')
+
+    def remove_camera(self, camera_id):
+        self.camera_ids.remove(camera_id)
+        self._pending.pop(camera_id, None)
+        self._predicted.discard(camera_id)
+
+    def add(self, camera_id, result, predicted=False):
+        if camera_id in self._pending and camera_id not in self._predicted:
+            if predicted:
+                # A pending real result is never replaced by a prediction
+                return
+            self.discarded += 1
+        self._pending[camera_id] = result
+        if predicted:
+            self._predicted.add(camera_id)
+        else:
+            self._predicted.discard(camera_id)
+
+    def poll(self, now):
+        if not self._pending:
+            return None
+        complete = len(self._pending) >= len(self.camera_ids)
+        oldest = min(result.captured_at for result in self._pending.values())
+        if not complete and now - oldest < self.window:
+            return None
+
+        newest = max(result.captured_at for result in self._pending.values())
+        kept = [camera_id for camera_id in self.camera_ids
+                if camera_id in self._pending
+                and newest - self._pending[camera_id].captured_at <= self.window]
+        results = [self._pending[camera_id] for camera_id in kept]
+        predicted = all(camera_id in self._predicted for camera_id in kept)
+        self.discarded += sum(1 for camera_id in self._pending
+                              if camera_id not in kept and camera_id not in self._predicted)
+        self._pending.clear()
+        self._predicted.clear()
+
+        # Real results only have to be newer than the last real one, a
+        # prediction also newer than the last prediction
+        last = self._last_time
+        if predicted:
+            last = max(last, self._last_predicted_time)
+        if newest <= last:
+            # Older than what gestures already saw
+            if not predicted:
+                self.discarded += len(results)
+            return None
+        if predicted:
+            self._last_predicted_time = newest
+        else:
+            self._last_time = newest
+
+        if not complete:
+            self.partial += 1
+        self.fused += 1
+        landmarks, handedness = self.merge(results)
+        return InferenceResult(
+            self.fused, newest, landmarks, handedness,
+            max(result.inference_time for result in results))
+
+    def merge(self, results):
+        if len(results) == 1:
+            return results[0].landmarks, results[0].handedness
+        hands, sides = [], []
+        for result in results:
+            for hand, side in zip(result.landmarks, result.handedness):
+                if side not in sides and len(hands) < self.max_hands:
+                    hands.append(hand)
+                    sides.append(side)
+        if not hands:
+            return empty_hands()
+        return np.stack(hands), np.array(sides, dtype=np.int8)
+
+
+class CameraSet:
+    # Runs several cameras at once. Every camera has its own capture thread and
+    # inference process, so the work spreads over the cores; cpu_budget caps the
+    # total inference rate at max_inference_fps per core. The first camera is
+    # the primary one: it feeds the preview and wins when results are fused.
+    def __init__(self, channels, cpu_budget=None, max_inference_fps=30.0,
+                 fusion_window=0.05, max_hands=2):
+        self.channels = list(channels)
+        self.fusion = LandmarkFusion([channel.camera_id for channel in self.channels],
+                                     fusion_window, max_hands)
+        self.set_cpu_budget(cpu_budget, max_inference_fps)
+
+    @property
+    def primary(self):
+        return self.channels[0]
+
+    @property
+    def running(self):
+        return self.primary.running
+
+    @property
+    def camera_ids(self):
+        return [channel.camera_id for channel in self.channels]
+
+    def set_cpu_budget(self, cpu_budget=None, max_inference_fps=30.0):
+        self.cpu_budget = default_cpu_budget() if cpu_budget is None else cpu_budget
+        self.max_inference_fps = max_inference_fps
+        share = min(1.0, self.cpu_budget / len(self.channels))
+        for channel in self.channels:
+            channel.min_interval = 1.0 / (max_inference_fps * share)
+
+    def start(self):
+        # The primary camera has to open, the others are dropped if they don't
+        for channel in list(self.channels):
+            try:
+                channel.capture.start()
+            except Exception as e:
+                if channel is self.primary:
+                    self.stop()
+                    raise
+                print(f"Camera {channel.camera_id} not started: {e}")
+                self._remove(channel)
+
+    def step(self, now):
+        # Returns (new primary FrameBuffer or None, fused result or None), only
+        # the primary camera's frames are kept
+        primary_frame = None
+        for channel in list(self.channels):
+            if channel is not self.primary and not channel.running:
+                print(f"Camera {channel.camera_id} lost: {channel.error}")
+                self._remove(channel)
+                continue
+            frame, result, predicted = channel.step(now)
+            if result is not None:
+                self.fusion.add(channel.camera_id, result, predicted)
+            if channel is self.primary:
+                primary_frame = frame
+            elif frame is not None:
+                frame.release()
+        return primary_frame, self.fusion.poll(now)
+
+    def configure(self, **config):
+        # The primary worker may be shared, its owner configures it
+        for channel in self.channels:
+            if channel.owns_inference:
+                channel.inference.configure(**config)
+
+    def stats(self, now):
+        return [channel.stats(now) for channel in self.channels]
+
+    def stop(self):
+        for channel in self.channels:
+            channel.stop()
+
+    def _remove(self, channel):
+        channel.stop()
+        self.channels.remove(channel)
+        self.fusion.remove_camera(channel.camera_id)
+        self.set_cpu_budget(self.cpu_budget, self.max_inference_fps)
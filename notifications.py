@@ -0,0 +1,126 @@
+import time
+
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import QLabel
+
+TOAST_STYLE = """
+    QLabel {{
+        background-color: {color};
+        color: white;
+        padding: 10px 20px;
+        border-radius: 5px;
+        font-size: 14px;
+    }}
+"""
+
+
+class _Toast:
+    def __init__(self, label):
+        self.label = label
+        self.message = None
+        self.color = None
+        self.count = 0
+        self.shown_count = 0
+        self.expires = 0.0
+
+
+class ToastManager(QObject):
+    # Feedback messages on a small, fixed pool of labels. A message that is
+    # already on screen is not shown again, its counter goes up and it stays a
+    # little longer. Counters and expiry are only applied to the labels every
+    # refresh_interval, so the cost stays flat however often gestures fire.
+    def __init__(self, parent, pool_size=3, duration=2.0, refresh_interval=0.1,
+                 top=20, spacing=8):
+        super().__init__(parent)
+        self.parent_widget = parent
+        self.duration = duration
+        self.top = top
+        self.spacing = spacing
+
+        self.shown = 0
+        self.merged = 0
+
+        self._styles = {}  # color -> stylesheet, parsed once per color
+        self._toasts = []
+        for _ in range(pool_size):
+            label = QLabel(parent)
+            label.hide()
+            self._toasts.append(_Toast(label))
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(refresh_interval * 1000))
+        self._timer.timeout.connect(self._refresh)
+
+    def show(self, message, color):
+        now = time.monotonic()
+        for toast in self._toasts:
+            if toast.message == message and toast.color == color:
+                toast.count += 1
+                toast.expires = now + self.duration
+                self.merged += 1
+                return
+
+        # A free label, or the one closest to expiring
+        toast = min(self._toasts, key=lambda toast: (toast.message is not None, toast.expires))
+        if toast.color != color:
+            toast.label.setStyleSheet(self._style(color))
+            toast.color = color
+        toast.message = message
+        toast.count = toast.shown_count = 1
+        toast.expires = now + self.duration
+        toast.label.setText(message)
+        toast.label.adjustSize()
+        toast.label.show()
+        toast.label.raise_()
+        self.shown += 1
+
+        self._layout()
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def clear(self):
+        for toast in self._toasts:
+            self._hide(toast)
+        self._timer.stop()
+
+    def _style(self, color):
+        style = self._styles.get(color)
+        if style is None:
+            style = self._styles[color] = TOAST_STYLE.format(color=color)
+        return style
+
+    def _refresh(self):
+        now = time.monotonic()
+        changed = False
+        for toast in self._toasts:
+            if toast.message is None:
+                continue
+            if now >= toast.expires:
+                self._hide(toast)
+                changed = True
+            elif toast.count != toast.shown_count:
+                toast.label.setText(f"{toast.message} (x{toast.count})")
+                toast.label.adjustSize()
+                toast.shown_count = toast.count
+                changed = True
+
+        if changed:
+            self._layout()
+        if all(toast.message is None for toast in self._toasts):
+            self._timer.stop()
+
+    def _hide(self, toast):
+        # The color is kept, so the stylesheet is reused next time
+        toast.label.hide()
+        toast.message = None
+        toast.count = toast.shown_count = 0
+
+    def _layout(self):
+        # Stack visible toasts at the top center, oldest first
+        y = self.top
+        visible = sorted((toast for toast in self._toasts if toast.message is not None),
+                         key=lambda toast: toast.expires - self.duration)
+        for toast in visible:
+            label = toast.label
+            label.move((self.parent_widget.width() - label.width()) // 2, y)
+            y += label.height() + self.spacing
@@ -0,0 +1,131 @@
+import cv2
+import numpy as np
+
+# MediaPipe's default hand style, BGR
+RED = (48, 48, 255)
+GREEN = (48, 255, 48)
+BLUE = (192, 101, 21)
+YELLOW = (0, 204, 255)
+GRAY = (128, 128, 128)
+PURPLE = (128, 64, 128)
+PEACH = (180, 229, 255)
+WHITE = (224, 224, 224)
+
+# Each part of the hand as one open chain of landmarks, with its colour and
+# line thickness. Together they cover every HAND_CONNECTIONS edge once.
+HAND_CHAINS = [
+    ([1, 0, 5, 9, 13, 17, 0], GRAY, 3),  # palm
+    ([1, 2, 3, 4], PEACH, 2),           # thumb
+    ([5, 6, 7, 8], PURPLE, 2),          # index
+    ([9, 10, 11, 12], YELLOW, 2),       # middle
+    ([13, 14, 15, 16], GREEN, 2),       # ring
+    ([17, 18, 19, 20], BLUE, 2),        # pinky
+]
+
+JOINT_COLORS = np.array(
+    [RED, RED, PEACH, PEACH, PEACH, RED, PURPLE, PURPLE, PURPLE, RED, YELLOW, YELLOW,
+     YELLOW, RED, GREEN, GREEN, GREEN, RED, BLUE, BLUE, BLUE], dtype=np.uint8)
+
+BANNER_COLOR = (0, 255, 0)
+
+
+class _Sprite:
+    # Text rendered once, copied through its mask afterwards
+    def __init__(self, text, scale, thickness, color):
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        (w, h), baseline = cv2.getTextSize(text, font, scale, thickness)
+        pad = thickness
+        self.ascent = h + pad
+        self.image = np.zeros((h + baseline + 2 * pad, w + 2 * pad, 3), dtype=np.uint8)
+        cv2.putText(self.image, text, (pad, self.ascent), font, scale, color, thickness)
+        self.mask = self.image.any(axis=2).astype(np.uint8)
+
+    def blit(self, frame, x, y):
+        # (x, y) is the text baseline origin, like putText
+        top = y - self.ascent
+        h, w = self.mask.shape
+        y0, x0 = max(top, 0), max(x, 0)
+        y1, x1 = min(top + h, frame.shape[0]), min(x + w, frame.shape[1])
+        if y0 >= y1 or x0 >= x1:
+            return
+        sy, sx = y0 - top, x0 - x
+        rows, cols = slice(sy, sy + y1 - y0), slice(sx, sx + x1 - x0)
+        cv2.copyTo(self.image[rows, cols], self.mask[rows, cols], frame[y0:y1, x0:x1])
+
+
+class OverlayRenderer:
+    # Landmarks and mode banners for the preview. Styles, the joint stamp and
+    # banner sprites are built once; per frame the connections are one
+    # cv2.polylines call per colour for all hands together and the joints a
+    # single indexed write of the precomputed stamp. Pass size to draw on a
+    # copy scaled down to the preview instead of on the full frame, into out
+    # if given.
+    def __init__(self, joint_radius=5, border=1, banner_scale=1.0, banner_thickness=2):
+        self.chains = [(np.array(chain), color, thickness)
+                       for chain, color, thickness in HAND_CHAINS]
+        self.joint_radius = joint_radius
+        self.reach = joint_radius + border
+        self.banner_scale = banner_scale
+        self.banner_thickness = banner_thickness
+
+        # Every pixel of a joint with its colour: a white rim around the
+        # joint's own colour, (21, pixels, 3)
+        y, x = np.mgrid[-self.reach:self.reach + 1, -self.reach:self.reach + 1]
+        distance = x * x + y * y
+        inside = distance <= self.reach * self.reach
+        self._dy, self._dx = y[inside], x[inside]
+        rim = distance[inside] > joint_radius * joint_radius
+        self._stamp_colors = np.where(rim[None, :, None], np.array(WHITE, dtype=np.uint8),
+                                      JOINT_COLORS[:, None, :])
+        self._stamp_cache = {}  # (frame width, hands) -> (pixel offsets, colours)
+        self._sprites = {}
+
+    def render(self, frame, hands, banners=(), size=None, out=None):
+        # hands is a (hands, 21, 3) array of normalised landmarks, banners a
+        # list of (text, (x, y)). Returns the frame that was drawn on.
+        if size is not None and size[0] < frame.shape[1] and size[1] < frame.shape[0]:
+            frame = cv2.resize(frame, size, dst=out, interpolation=cv2.INTER_AREA)
+        if len(hands):
+            self.draw_hands(frame, hands)
+        for text, position in banners:
+            self.sprite(text).blit(frame, *position)
+        return frame
+
+    def draw_hands(self, frame, hands):
+        h, w = frame.shape[:2]
+        points = (hands[..., :2] * (w, h)).astype(np.int32)
+        np.minimum(points, (w - 1, h - 1), out=points)
+
+        for chain, color, thickness in self.chains:
+            cv2.polylines(frame, np.ascontiguousarray(points[:, chain]), False, color, thickness)
+
+        points = points.reshape(-1, 2)
+        inside = ((points >= self.reach) & (points < (w - self.reach, h - self.reach))).all(axis=1)
+        offsets, colors = self._stamp(w, len(hands))
+        if inside.all():
+            pixels = (points[:, 1] * w + points[:, 0])[:, None] + offsets
+            frame.reshape(-1, 3)[pixels.reshape(-1)] = colors
+            return
+
+        # Joints near the border would wrap around, clip them one by one
+        colors = colors.reshape(len(points), -1, 3)
+        for (x, y), joint_colors in zip(points, colors):
+            py, px = y + self._dy, x + self._dx
+            valid = (py >= 0) & (py < h) & (px >= 0) & (px < w)
+            frame[py[valid], px[valid]] = joint_colors[valid]
+
+    def _stamp(self, width, hands):
+        key = (width, hands)
+        stamp = self._stamp_cache.get(key)
+        if stamp is None:
+            offsets = (self._dy * width + self._dx).astype(np.intp)
+            colors = np.ascontiguousarray(np.tile(self._stamp_colors, (hands, 1, 1)).reshape(-1, 3))
+            stamp = self._stamp_cache[key] = (offsets, colors)
+        return stamp
+
+    def sprite(self, text):
+        sprite = self._sprites.get(text)
+        if sprite is None:
+            sprite = self._sprites[text] = _Sprite(text, self.banner_scale,
+                                                   self.banner_thickness, BANNER_COLOR)
+        return sprite
@@ -0,0 +1,226 @@
+from collections import Counter
+
+from gestures import GestureStateMachine
+from landmarks import (INDEX_TIP, THUMB_TIP, WRIST, PAIR_INDEX_TIP,
+                       PAIR_MIDDLE_MCP, count_fingers, pair_deltas, pair_distances)
+from tracing import tracer
+
+# Virtual keyboard key map, screen divided into a 4x3 grid
+VIRTUAL_KEYBOARD_LAYOUT = {
+    (0, 0): 'a', (1, 0): 's', (2, 0): 'd', (3, 0): 'f',
+    (0, 1): 'q', (1, 1): 'w', (2, 1): 'e', (3, 1): 'r',
+    (0, 2): 'z', (1, 2): 'x', (2, 2): 'c', (3, 2): 'v'
+}
+
+
+class ClickDebouncer:
+    # Hysteresis on the thumb-over-index offset: a click fires when the offset
+    # rises above press, and can only fire again after it fell below release
+    def __init__(self, press=0.02, release=-0.02, min_interval=0.3):
+        self.press = press
+        self.release = release
+        self.min_interval = min_interval
+        self.pressed = False
+        self.last_click = float('-inf')
+
+    def update(self, offset, now):
+        if self.pressed:
+            if offset < self.release:
+                self.pressed = False
+            return False
+        if offset > self.press and now - self.last_click >= self.min_interval:
+            self.pressed = True
+            self.last_click = now
+            return True
+        return False
+
+
+class GesturePipeline:
+    # Turns landmark arrays into actions. All side effects go through the
+    # actions object, so the same logic drives the Qt app and headless replay.
+    #
+    # actions must provide: take_screenshot(), press_key(key), set_volume(level),
+    # move_cursor(x, y), click(), control_media(command), show_gesture(text),
+    # play_sound(name) and screen_geometry() -> (left, top, width, height) of the
+    # whole desktop
+    def __init__(self, actions, profile=None):
+        self.actions = actions
+        self.clap_threshold = 0.3
+        self.clap_cooldown = 1.0
+        self.last_clap_time = float('-inf')
+        self.shortcuts = {}
+        self.shortcut_machine = GestureStateMachine([])
+        self.virtual_keyboard_active = False
+        self.mouse_control_active = False
+        self.exercise_mode_active = False
+        self.click_debouncer = ClickDebouncer()
+        self.gesture_counts = Counter()  # gestures fired, by type
+        if profile is not None:
+            self.apply_profile(profile)
+
+    def apply_profile(self, profile):
+        self.clap_threshold = profile['clap_threshold']
+        self.shortcuts = profile['shortcuts']
+        # Finger-count shortcuts fire once per gesture, not once per frame
+        self.shortcut_machine = GestureStateMachine.from_shortcuts(self.shortcuts)
+
+    def process(self, hands, now):
+        # hands is a (hands, 21, 3) landmark array, now a timestamp in seconds
+        finger_count = None
+        if len(hands) == 2:
+            with tracer.span('gestures.two_hand', 'gesture'):
+                self.process_two_hand_gesture(hands, now)
+        elif len(hands):
+            with tracer.span('gestures.single_hand', 'gesture'):
+                for hand in hands:
+                    self.process_single_hand_gesture(hand, now)
+            if self.shortcut_machine.rules:
+                finger_count = int(count_fingers(hands[:1])[0])
+
+        # Shortcut based on finger count
+        with tracer.span('gestures.shortcuts', 'gesture'):
+            self.handle_finger_shortcuts(finger_count, now)
+
+    def process_two_hand_gesture(self, hands, now):
+        # Two hand gesture detection, hands is a (2, 21, 3) landmark array
+        deltas = pair_deltas(hands)
+        distances = pair_distances(deltas)
+
+        # Clap detection
+        if distances[PAIR_MIDDLE_MCP] < self.clap_threshold:
+            if now - self.last_clap_time > self.clap_cooldown:
+                self.actions.take_screenshot()
+                self.last_clap_time = now
+                self.gesture_counts['clap'] += 1
+
+        # Virtual keyboard control
+        if self.virtual_keyboard_active:
+            self.handle_virtual_keyboard(hands, distances[PAIR_INDEX_TIP])
+
+        # Volume control
+        self.handle_volume_control(deltas[PAIR_INDEX_TIP])
+
+    def process_single_hand_gesture(self, landmarks, now):
+        # Single hand gesture detection, landmarks is a (21, 3) array
+
+        # Mouse control
+        if self.mouse_control_active:
+            self.handle_mouse_control(landmarks, now)
+
+        # Exercise mode controls
+        if self.exercise_mode_active:
+            self.handle_exercise_tracking(landmarks)
+
+    def handle_virtual_keyboard(self, hands, distance):
+        # Virtual keyboard control
+        if distance < 0.1:  # Fingers are close
+            avg_x, avg_y = hands[:2, INDEX_TIP, :2].mean(axis=0)
+
+            # Convert screen coordinates
+            left, top, screen_w, screen_h = self.actions.screen_geometry()
+            screen_x = left + int(avg_x * screen_w)
+            screen_y = top + int(avg_y * screen_h)
+
+            # Virtual key press
+            key = self.get_virtual_key(screen_x, screen_y)
+            if key:
+                self.gesture_counts['virtual_key'] += 1
+                self.actions.press_key(key)
+                self.actions.play_sound('gesture')
+
+    def handle_mouse_control(self, landmarks, now):
+        # Mouse control
+        left, top, screen_w, screen_h = self.actions.screen_geometry()
+        index_x = left + int(landmarks[INDEX_TIP, 0] * screen_w)
+        index_y = top + int(landmarks[INDEX_TIP, 1] * screen_h)
+
+        # Move cursor, the actuator smooths towards this target
+        self.actions.move_cursor(index_x, index_y)
+
+        # Click control, once per thumb press
+        offset = float(landmarks[THUMB_TIP, 1] - landmarks[INDEX_TIP, 1])
+        if self.click_debouncer.update(offset, now):
+            self.gesture_counts['click'] += 1
+            self.actions.click()
+            self.actions.play_sound('gesture')
+
+    def handle_volume_control(self, index_delta):
+        # Volume control, index_delta is the xy offset between both index tips
+        y_diff = abs(float(index_delta[1]))
+        volume_level = 1 - min(y_diff, 0.5) * 2  # 0-1 range
+        self.actions.set_volume(volume_level)
+
+    def handle_finger_shortcuts(self, finger_count, now):
+        # finger_count is None while no single hand is visible
+        for event in self.shortcut_machine.update(finger_count, now):
+            if event.kind == 'exit':
+                continue
+            self.gesture_counts[event.name] += 1
+            command = event.command
+            if command.startswith('key:'):
+                self.actions.press_key(command[4:])
+            elif command.startswith('media:'):
+                self.actions.control_media(command[6:])
+            self.actions.play_sound('gesture')
+
+    def handle_exercise_tracking(self, landmarks):
+        # Exercise tracking
+        wrist_y = landmarks[WRIST, 1]
+        shoulder_threshold = 0.3
+
+        if wrist_y < shoulder_threshold:
+            self.actions.show_gesture("Raise Hand")
+        else:
+            self.actions.show_gesture("Sit Up")
+
+    def get_virtual_key(self, x, y):
+        # Divide screen into grid
+        left, top, screen_w, screen_h = self.actions.screen_geometry()
+        grid_x = (x - left) // (screen_w // 4)
+        grid_y = (y - top) // (screen_h // 3)
+
+        return VIRTUAL_KEYBOARD_LAYOUT.get((grid_x, grid_y))
+
+
+class EventLog:
+    # Side-effect free actions, everything is recorded instead of executed
+    def __init__(self, screen_size=(1920, 1080)):
+        self.events = []
+        self.timestamp = 0.0
+        self.frame_index = 0
+        self._screen_size = screen_size
+
+    def _record(self, action, *args):
+        self.events.append({
+            'frame': self.frame_index,
+            'time': round(self.timestamp, 4),
+            'action': action,
+            'args': list(args),
+        })
+
+    def take_screenshot(self):
+        self._record('screenshot')
+
+    def press_key(self, key):
+        self._record('key', key)
+
+    def set_volume(self, level):
+        self._record('volume', round(level, 4))
+
+    def move_cursor(self, x, y):
+        self._record('cursor', x, y)
+
+    def click(self):
+        self._record('click')
+
+    def control_media(self, command):
+        self._record('media', command)
+
+    def show_gesture(self, text):
+        self._record('gesture', text)
+
+    def play_sound(self, name):
+        self._record('sound', name)
+
+    def screen_geometry(self):
+        return (0, 0) + tuple(self._screen_size)
@@ -0,0 +1,155 @@
+"""Headless replay of recorded footage through the gesture pipeline.
+
+Frames from a video file or a directory of images go through the same flip,
+cvtColor, inference and gesture steps as the app, without a window and
+without touching the keyboard, mouse, volume or Spotify. Actions end up in an
+event log instead.
+
+    python replay.py recording.mp4 --events events.jsonl
+    python replay.py frames/ --fps 30 --realtime --mode keyboard
+"""
+import argparse
+import json
+import os
+import pickle
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from inference import DEFAULT_HANDS_CONFIG, create_detector
+from pipeline import EventLog, GesturePipeline
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def iter_frames(source, fps=None):
+    # Yields (index, timestamp, bgr_frame) from a video file or an image directory
+    if os.path.isdir(source):
+        fps = fps or 30.0
+        names = sorted(name for name in os.listdir(source)
+                       if name.lower().endswith(IMAGE_EXTENSIONS))
+        for index, name in enumerate(names):
+            frame = cv2.imread(os.path.join(source, name))
+            if frame is not None:
+                yield index, index / fps, frame
+        return
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise Exception(f"Could not open {source}")
+    fps = fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield index, index / fps, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+class Replay:
+    # Drives a GesturePipeline from recorded frames with an EventLog as actions
+    def __init__(self, profile=None, hands_config=None, adaptive=None,
+                 screen_size=(1920, 1080)):
+        self.events = EventLog(screen_size)
+        self.gestures = GesturePipeline(self.events, profile)
+        self.detector = create_detector(
+            dict(DEFAULT_HANDS_CONFIG, **(hands_config or {})), adaptive)
+        self.inference_times = []
+        self.frames = 0
+        self.elapsed = 0.0
+
+    def process_frame(self, frame, timestamp, index=0):
+        self.events.timestamp = timestamp
+        self.events.frame_index = index
+
+        frame = cv2.flip(frame, 1)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        start = time.perf_counter()
+        hands, _ = self.detector.detect(rgb_frame)
+        self.inference_times.append(time.perf_counter() - start)
+
+        self.gestures.process(hands, timestamp)
+        self.frames += 1
+        return hands
+
+    def run(self, frames, realtime=False, max_frames=None):
+        start = time.perf_counter()
+        for index, timestamp, frame in frames:
+            if max_frames is not None and self.frames >= max_frames:
+                break
+            if realtime:
+                # Hold frames back until their recorded time
+                delay = timestamp - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.process_frame(frame, timestamp, index)
+        self.elapsed = time.perf_counter() - start
+        return self.summary()
+
+    def summary(self):
+        inference_ms = np.array(self.inference_times or [0.0]) * 1000
+        return {
+            'frames': self.frames,
+            'elapsed_s': self.elapsed,
+            'fps': self.frames / self.elapsed if self.elapsed else 0.0,
+            'inference_mean_ms': float(inference_ms.mean()),
+            'inference_p95_ms': float(np.percentile(inference_ms, 95)),
+            'events': dict(Counter(event['action'] for event in self.events.events)),
+        }
+
+    def close(self):
+        self.detector.close()
+
+
+def load_profile(path, name):
+    with open(path, 'rb') as f:
+        return pickle.load(f)[name]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run recorded footage through the gesture pipeline without a GUI")
+    parser.add_argument('source', help="Video file or directory of images")
+    parser.add_argument('--fps', type=float, help="Frame rate, defaults to the video's own")
+    parser.add_argument('--realtime', action='store_true', help="Pace frames at recorded speed")
+    parser.add_argument('--max-frames', type=int)
+    parser.add_argument('--profiles', default='profiles.pkl')
+    parser.add_argument('--profile', default='default')
+    parser.add_argument('--mode', action='append', default=[],
+                        choices=['keyboard', 'mouse', 'exercise'])
+    parser.add_argument('--adaptive', action='store_true', help="Use ROI-cropped inference")
+    parser.add_argument('--events', help="Write the event log as JSON lines")
+    args = parser.parse_args()
+
+    try:
+        profile = load_profile(args.profiles, args.profile)
+    except Exception as e:
+        print(f"Could not load profile {args.profile}: {e}")
+        profile = None
+
+    replay = Replay(profile, adaptive={} if args.adaptive else None)
+    replay.gestures.virtual_keyboard_active = 'keyboard' in args.mode
+    replay.gestures.mouse_control_active = 'mouse' in args.mode
+    replay.gestures.exercise_mode_active = 'exercise' in args.mode
+    try:
+        summary = replay.run(iter_frames(args.source, args.fps), args.realtime, args.max_frames)
+    finally:
+        replay.close()
+
+    if args.events:
+        with open(args.events, 'w') as f:
+            for event in replay.events.events:
+                f.write(json.dumps(event) + "\n")
+
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
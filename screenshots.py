@@ -0,0 +1,307 @@
+import datetime
+import io
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from PIL import Image
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from tracing import tracer
+
+# Optional faster screen grab backends, pyautogui is the fallback
+try:
+    import mss
+except ImportError:
+    mss = None
+
+try:
+    from PIL import ImageGrab
+except ImportError:
+    ImageGrab = None
+
+FORMAT_EXTENSIONS = {'png': 'png', 'jpeg': 'jpg', 'webp': 'webp'}
+
+
+class ScreenGrabber:
+    # Picks the fastest available backend, must be used from a single thread
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = 'mss' if mss is not None else 'pil' if ImageGrab is not None else 'pyautogui'
+        self.backend = backend
+        self._mss = None
+
+    def grab(self):
+        if self.backend == 'mss':
+            if self._mss is None:
+                self._mss = mss.mss()
+            shot = self._mss.grab(self._mss.monitors[0])
+            return Image.frombytes('RGB', shot.size, shot.bgra, 'raw', 'BGRX')
+        if self.backend == 'pil':
+            return ImageGrab.grab(all_screens=True)
+
+        import pyautogui
+        return pyautogui.screenshot()
+
+    def close(self):
+        if self._mss is not None:
+            self._mss.close()
+            self._mss = None
+
+
+class ScreenshotWriter(QObject):
+    # Grabs and encodes screenshots on a background thread. Requests beyond
+    # max_pending are rejected and reported through the overflow signal.
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    overflow = pyqtSignal(int)
+
+    def __init__(self, directory="screenshots", image_format='png', quality=90,
+                 png_compress_level=1, max_pending=4, backend=None, parent=None):
+        super().__init__(parent)
+        if image_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported screenshot format: {image_format}")
+        self.directory = directory
+        self.image_format = image_format
+        self.quality = quality
+        self.png_compress_level = png_compress_level
+        self.backend = backend
+
+        self.written = 0
+        self.dropped = 0
+        self.last_duration = 0.0
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="screenshot-writer",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is not None:
+            # Let queued screenshots finish before the sentinel
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def request(self, image=None):
+        # Queue a screenshot (or an already grabbed PIL image), never blocks
+        try:
+            self._queue.put_nowait((datetime.datetime.now(), image))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            self.overflow.emit(self.dropped)
+            return False
+
+    def encode_options(self):
+        if self.image_format == 'png':
+            return {'compress_level': self.png_compress_level}
+        if self.image_format == 'webp':
+            return {'quality': self.quality, 'method': 0}
+        return {'quality': self.quality}
+
+    def filename_for(self, requested_at):
+        timestamp = requested_at.strftime("%Y%m%d_%H%M%S")
+        extension = FORMAT_EXTENSIONS[self.image_format]
+        filename = os.path.join(self.directory, f"screenshot_{timestamp}.{extension}")
+        suffix = 1
+        while os.path.exists(filename):
+            filename = os.path.join(self.directory,
+                                    f"screenshot_{timestamp}_{suffix}.{extension}")
+            suffix += 1
+        return filename
+
+    def _run(self):
+        grabber = ScreenGrabber(self.backend)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                requested_at, image = item
+                start = time.perf_counter()
+                try:
+                    if image is None:
+                        with tracer.span('screenshot.grab', 'io'):
+                            image = grabber.grab()
+                    os.makedirs(self.directory, exist_ok=True)
+                    filename = self.filename_for(requested_at)
+                    if self.image_format == 'jpeg' and image.mode != 'RGB':
+                        image = image.convert('RGB')
+                    with tracer.span('screenshot.save', 'io'):
+                        image.save(filename, self.image_format.upper(), **self.encode_options())
+                except Exception as e:
+                    print(f"Could not save screenshot: {e}")
+                    self.failed.emit(str(e))
+                    continue
+
+                self.last_duration = time.perf_counter() - start
+                self.written += 1
+                self.saved.emit(filename)
+        finally:
+            grabber.close()
+
+
+class ScreenPreroll(QObject):
+    # Keeps the last few seconds of the screen in memory so a clap can save what
+    # happened just before it. Frames are downscaled and JPEG-encoded, the oldest
+    # ones are evicted once max_bytes or max_seconds is exceeded.
+    burst_saved = pyqtSignal(str, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, directory="screenshots", fps=2.0, scale=0.5, quality=70,
+                 max_bytes=64 * 1024 * 1024, max_seconds=10.0, clip_format='burst',
+                 backend=None, parent=None):
+        super().__init__(parent)
+        if clip_format not in ('burst', 'gif'):
+            raise ValueError(f"Unsupported pre-roll format: {clip_format}")
+        self.directory = directory
+        self.fps = fps
+        self.scale = scale
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.clip_format = clip_format
+        self.backend = backend
+
+        self.frames_captured = 0
+        self.frames_evicted = 0
+        self.bytes_used = 0
+
+        self._frames = deque()  # (timestamp, width, height, jpeg bytes)
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+        self._cpu_time = 0.0
+        self._started_at = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running.set()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="screen-preroll", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            self._frames.clear()
+            self.bytes_used = 0
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def stats(self):
+        # Memory use against the cap and the CPU share of the capture loop
+        with self._lock:
+            frames = len(self._frames)
+            bytes_used = self.bytes_used
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            'frames': frames,
+            'bytes_used': bytes_used,
+            'max_bytes': self.max_bytes,
+            'frames_captured': self.frames_captured,
+            'frames_evicted': self.frames_evicted,
+            'cpu_ms_per_frame': self._cpu_time * 1000 / self.frames_captured
+            if self.frames_captured else 0.0,
+            'cpu_percent': self._cpu_time * 100 / elapsed if elapsed else 0.0,
+        }
+
+    def save_burst(self, seconds=None):
+        # Saves the last seconds of the buffer in the background
+        seconds = self.max_seconds if seconds is None else seconds
+        cutoff = time.perf_counter() - seconds
+        with self._lock:
+            frames = [frame for frame in self._frames if frame[0] >= cutoff]
+        if not frames:
+            return False
+
+        requested_at = datetime.datetime.now()
+        threading.Thread(target=self._write_burst, args=(requested_at, frames),
+                         name="preroll-writer", daemon=True).start()
+        return True
+
+    def _run(self):
+        grabber = ScreenGrabber(self.backend)
+        interval = 1.0 / self.fps
+        next_grab = time.perf_counter()
+        try:
+            while self._running.is_set():
+                cpu_start = time.thread_time()
+                try:
+                    self._add(self._encode(grabber.grab()))
+                except Exception as e:
+                    print(f"Pre-roll capture error: {e}")
+                self._cpu_time += time.thread_time() - cpu_start
+
+                next_grab += interval
+                delay = next_grab - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind, don't try to catch up
+                    next_grab = time.perf_counter()
+        finally:
+            grabber.close()
+
+    def _encode(self, image):
+        if self.scale != 1:
+            size = (max(1, int(image.width * self.scale)), max(1, int(image.height * self.scale)))
+            image = image.resize(size, Image.BILINEAR)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=self.quality)
+        return time.perf_counter(), image.width, image.height, buffer.getvalue()
+
+    def _add(self, frame):
+        with self._lock:
+            self._frames.append(frame)
+            self.bytes_used += len(frame[3])
+            self.frames_captured += 1
+
+            # Evict the oldest frames past the memory cap or the time window
+            cutoff = frame[0] - self.max_seconds
+            while self._frames and (self.bytes_used > self.max_bytes
+                                    or self._frames[0][0] < cutoff):
+                evicted = self._frames.popleft()
+                self.bytes_used -= len(evicted[3])
+                self.frames_evicted += 1
+
+    def _write_burst(self, requested_at, frames):
+        timestamp = requested_at.strftime("%Y%m%d_%H%M%S")
+        try:
+            if self.clip_format == 'gif':
+                os.makedirs(self.directory, exist_ok=True)
+                filename = os.path.join(self.directory, f"preroll_{timestamp}.gif")
+                images = [Image.open(io.BytesIO(frame[3])) for frame in frames]
+                images[0].save(filename, save_all=True, append_images=images[1:],
+                               duration=int(1000 / self.fps), loop=0)
+            else:
+                # Frames are already JPEG encoded, write them out as they are
+                filename = os.path.join(self.directory, f"preroll_{timestamp}")
+                os.makedirs(filename, exist_ok=True)
+                for index, frame in enumerate(frames):
+                    with open(os.path.join(filename, f"frame_{index:03d}.jpg"), 'wb') as f:
+                        f.write(frame[3])
+        except Exception as e:
+            print(f"Could not save pre-roll: {e}")
+            self.failed.emit(str(e))
+            return
+        self.burst_saved.emit(filename, len(frames))
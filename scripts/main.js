@@ -160,4 +160,42 @@ setInterval(updateUptime, 1000);
 window.updateCameraStatus = updateCameraStatus;
 window.updateGestureText = updateGestureText;
 window.updateScreenshotCount = updateScreenshotCount;
-window.updateCameraList = updateCameraList; 
\ No newline at end of file
+window.updateCameraList = updateCameraList;
+
+// Preview frames are binary JPEGs fetched from the app's clapathon:// scheme,
+// the next one is only requested once the previous one has loaded
+const preview = document.getElementById('preview');
+let previewLoading = false;
+let previewPending = null;
+
+function showPreviewFrame(sequence) {
+    if (previewLoading) {
+        previewPending = sequence;
+        return;
+    }
+    previewLoading = true;
+    preview.src = `clapathon://preview/${sequence}.jpg`;
+}
+
+function previewDone() {
+    previewLoading = false;
+    if (previewPending !== null) {
+        const sequence = previewPending;
+        previewPending = null;
+        showPreviewFrame(sequence);
+    }
+}
+
+preview.addEventListener('load', previewDone);
+preview.addEventListener('error', previewDone);
+
+// Connect to the PyQt bridge
+new QWebChannel(qt.webChannelTransport, (channel) => {
+    window.bridge = channel.objects.bridge;
+    bridge.cameraStatusChanged.connect(updateCameraStatus);
+    bridge.gestureTextChanged.connect(updateGestureText);
+    bridge.cameraListChanged.connect(updateCameraList);
+    bridge.screenshotTaken.connect(updateScreenshotCount);
+    bridge.previewFrame.connect(showPreviewFrame);
+});
+ 
\ No newline at end of file
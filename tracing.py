@@ -0,0 +1,215 @@
+"""Span tracing for the frame pipeline, exported as Chrome trace JSON.
+
+Code marks its stages with the module level tracer:
+
+    from tracing import tracer
+
+    with tracer.span('gestures.process'):
+        ...
+
+While tracing is off, span() returns a shared no-op context manager, so the
+cost is one attribute check. Once enabled, spans from every thread go into a
+bounded ring buffer; export() writes them in the Chrome trace event format,
+which chrome://tracing and ui.perfetto.dev open directly. A SamplingProfiler
+can add periodic Python stack samples to the same trace.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+SAMPLE_DEPTH = 32
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer.record(self.name, self.category, self.start, end - self.start, self.args)
+        return False
+
+
+class Tracer:
+    def __init__(self, capacity=200000):
+        self.enabled = False
+        self._events = deque(maxlen=capacity)
+        self._samples = deque(maxlen=capacity)
+        self._thread_names = {}
+        self.sampler = None
+
+    def start(self, sample_rate=None):
+        # sample_rate in Hz also starts a SamplingProfiler
+        self.clear()
+        self.enabled = True
+        if sample_rate:
+            self.sampler = SamplingProfiler(self, sample_rate)
+            self.sampler.start()
+
+    def stop(self):
+        self.enabled = False
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+
+    def clear(self):
+        self._events.clear()
+        self._samples.clear()
+
+    def span(self, name, category='pipeline', args=None):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def traced(self, name=None, category='pipeline'):
+        # Decorator form of span()
+        def decorate(func):
+            span_name = name or func.__qualname__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, span_name, category, None):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, name, category, start_ns, duration_ns, args=None):
+        tid = threading.get_ident()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        # deque.append is atomic, no lock needed across threads
+        self._events.append((name, category, start_ns, duration_ns, tid, args))
+
+    def record_sample(self, tid, timestamp_ns, stack):
+        self._samples.append((tid, timestamp_ns, stack))
+
+    def __len__(self):
+        return len(self._events)
+
+    def trace_events(self):
+        pid = os.getpid()
+        events = [
+            {'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': 'clapathon'}},
+        ]
+        for tid, name in list(self._thread_names.items()):
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                           'args': {'name': name}})
+        for name, category, start, duration, tid, args in list(self._events):
+            event = {'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': tid,
+                     'ts': start / 1000, 'dur': duration / 1000}
+            if args:
+                event['args'] = args
+            events.append(event)
+        if self._samples:
+            events.extend(self._sample_events(pid + 1))
+        return events
+
+    def _sample_events(self, pid):
+        # Consecutive samples sharing a frame become one span per frame, in a
+        # separate process row so they don't clash with the recorded spans
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid,
+                   'args': {'name': 'clapathon (samples)'}}]
+        by_thread = {}
+        for tid, timestamp, stack in list(self._samples):
+            by_thread.setdefault(tid, []).append((timestamp, stack))
+
+        for tid, samples in by_thread.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                           'args': {'name': self._thread_names.get(tid, str(tid))}})
+            interval = ((samples[-1][0] - samples[0][0]) / (len(samples) - 1)
+                        if len(samples) > 1 else 1000000)
+            open_frames = []  # (frame, start)
+
+            def close(depth, end):
+                while len(open_frames) > depth:
+                    frame, start = open_frames.pop()
+                    events.append({'name': frame, 'cat': 'sample', 'ph': 'X', 'pid': pid,
+                                   'tid': tid, 'ts': start / 1000, 'dur': (end - start) / 1000})
+
+            for timestamp, stack in samples:
+                common = 0
+                while (common < len(open_frames) and common < len(stack)
+                       and open_frames[common][0] == stack[common]):
+                    common += 1
+                close(common, timestamp)
+                for frame in stack[common:]:
+                    open_frames.append((frame, timestamp))
+            close(0, samples[-1][0] + interval)
+        return events
+
+    def export(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+class SamplingProfiler:
+    # Records the Python stack of every thread rate times a second
+    def __init__(self, tracer, rate=100.0):
+        self.tracer = tracer
+        self.interval = 1.0 / rate
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter_ns()
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < SAMPLE_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                    frame = frame.f_back
+                stack.reverse()
+                self.tracer.record_sample(tid, now, stack)
+            self.samples += 1
+
+
+# Shared by every module, see the module docstring
+tracer = Tracer()
@@ -0,0 +1,137 @@
+import numpy as np
+
+from landmarks import NUM_LANDMARKS
+
+
+class LandmarkHistory:
+    # Ring buffer of the last capacity measurements, stored in preallocated
+    # arrays: times (capacity,), landmarks (capacity, max_hands, 21, 3),
+    # handedness (capacity, max_hands) and hand counts (capacity,)
+    def __init__(self, capacity=8, max_hands=2):
+        self.capacity = capacity
+        self.max_hands = max_hands
+        self.times = np.zeros(capacity)
+        self.landmarks = np.zeros((capacity, max_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.handedness = np.zeros((capacity, max_hands), dtype=np.int8)
+        self.counts = np.zeros(capacity, dtype=np.int8)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, landmarks, handedness):
+        i = self._next
+        count = min(len(landmarks), self.max_hands)
+        self.times[i] = timestamp
+        self.counts[i] = count
+        self.landmarks[i, :count] = landmarks[:count]
+        self.handedness[i, :count] = handedness[:count]
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def latest(self, back=0):
+        # (timestamp, landmarks, handedness) of the back-th newest entry, the
+        # arrays are views into the buffer
+        i = (self._next - 1 - back) % self.capacity
+        count = self.counts[i]
+        return self.times[i], self.landmarks[i, :count], self.handedness[i, :count]
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+
+class LandmarkPredictor:
+    # Constant-velocity model per landmark, with the velocity smoothed over
+    # successive measurements (an alpha-beta filter). Between real inference
+    # runs, predict() extrapolates the last measurement. should_infer() asks for
+    # real inference every interval frames, or on every frame while the hands
+    # move faster than max_speed (normalised units per second) or the last
+    # prediction was off by more than max_error.
+    def __init__(self, interval=2, max_speed=1.5, max_error=0.03, max_horizon=0.15,
+                 velocity_smoothing=0.5, history=8, max_hands=2):
+        self.interval = interval
+        self.max_speed = max_speed
+        self.max_error = max_error
+        self.max_horizon = max_horizon
+        self.velocity_smoothing = velocity_smoothing
+        self.history = LandmarkHistory(history, max_hands)
+
+        self.velocity = None  # (hands, 21, 3) per second, None until two matching measurements
+        self.last_error = 0.0
+        self.frames_since_inference = 0
+
+        self.inferred = 0
+        self.forced = 0
+        self.predicted = 0
+
+    @property
+    def ready(self):
+        return len(self.history) > 0
+
+    def reset(self):
+        self.history.clear()
+        self.velocity = None
+        self.last_error = 0.0
+        self.frames_since_inference = 0
+
+    def update(self, landmarks, handedness, timestamp):
+        # Feed a real inference result
+        if len(self.history):
+            last_time, last, last_handedness = self.history.latest()
+            dt = timestamp - last_time
+            if (dt > 0 and len(last) == len(landmarks)
+                    and np.array_equal(last_handedness, handedness[:len(last)])):
+                if self.velocity is not None and self.velocity.shape == landmarks.shape:
+                    predicted = last + self.velocity * min(dt, self.max_horizon)
+                    self.last_error = (float(np.abs(predicted[..., :2] - landmarks[..., :2]).mean())
+                                       if len(landmarks) else 0.0)
+                    measured = (landmarks - last) / dt
+                    self.velocity += self.velocity_smoothing * (measured - self.velocity)
+                else:
+                    self.velocity = (landmarks - last) / dt
+                    self.last_error = 0.0
+            elif dt > 0:
+                # Hands appeared, disappeared or swapped, start over
+                self.velocity = None
+                self.last_error = 0.0
+        self.history.append(timestamp, landmarks, handedness)
+
+    def speed(self):
+        # Fastest landmark in the xy plane, normalised units per second
+        if self.velocity is None or not len(self.velocity):
+            return 0.0
+        return float(np.sqrt((self.velocity[..., :2] ** 2).sum(axis=-1)).max())
+
+    def should_infer(self):
+        # Called once per new frame
+        self.frames_since_inference += 1
+        if self.velocity is None or self.frames_since_inference >= self.interval:
+            return True
+        if self.speed() > self.max_speed or self.last_error > self.max_error:
+            self.forced += 1
+            return True
+        return False
+
+    def mark_inferred(self):
+        self.frames_since_inference = 0
+        self.inferred += 1
+
+    def predict(self, timestamp):
+        # (landmarks, handedness) extrapolated to timestamp
+        last_time, last, handedness = self.history.latest()
+        self.predicted += 1
+        if self.velocity is None or self.velocity.shape != last.shape:
+            return last.copy(), handedness.copy()
+        dt = min(max(timestamp - last_time, 0.0), self.max_horizon)
+        return last + self.velocity * dt, handedness.copy()
+
+    def stats(self):
+        return {
+            'inferred': self.inferred,
+            'forced': self.forced,
+            'predicted': self.predicted,
+            'speed': self.speed(),
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,183 @@
+import json
+import os
+
+import cv2
+from PyQt5.QtCore import QBuffer, QIODevice, QObject, QUrl, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QMessageBox
+
+PREVIEW_SCHEME = b'clapathon'
+
+# imageQuality setting -> JPEG quality of the preview pushed to the page
+IMAGE_QUALITY = {'high': 90, 'medium': 75, 'low': 50}
+
+HELP_TEXT = """Clap: screenshot
+Index finger up/down: volume
+Finger count: profile shortcuts
+Modes: virtual keyboard, mouse control, exercise tracking"""
+
+
+def register_preview_scheme():
+    # Has to run before the QApplication is created. QtWebEngineWidgets has to
+    # be imported by then as well, WebUi only uses it later.
+    import PyQt5.QtWebEngineWidgets  # noqa: F401
+    from PyQt5.QtWebEngineCore import QWebEngineUrlScheme
+    scheme = QWebEngineUrlScheme(PREVIEW_SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Path)
+    scheme.setFlags(QWebEngineUrlScheme.SecureScheme | QWebEngineUrlScheme.CorsEnabled)
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+
+def _int_setting(settings, key, default, low, high):
+    # Empty or malformed fields (parseInt gives NaN, sent as null) fall back to default
+    try:
+        value = int(settings.get(key, default))
+    except (TypeError, ValueError):
+        value = default
+    return min(max(value, low), high)
+
+
+def _resolution_setting(settings, default=(640, 480)):
+    try:
+        width, height = (int(value) for value in settings.get('resolution').split('x'))
+    except (AttributeError, TypeError, ValueError):
+        return default
+    if width <= 0 or height <= 0:
+        return default
+    return width, height
+
+
+def parse_settings(settings):
+    # Settings as sent by saveSettings in scripts/main.js, every field is
+    # validated and defaulted so bad input never escapes the slot
+    if not isinstance(settings, dict):
+        settings = {}
+    return {
+        'resolution': _resolution_setting(settings),
+        'fps_limit': _int_setting(settings, 'fpsLimit', 30, 1, 60),
+        'preview_quality': IMAGE_QUALITY.get(settings.get('imageQuality'), IMAGE_QUALITY['high']),
+        'confidence': _int_setting(settings, 'confidenceThreshold', 70, 1, 100) / 100,
+    }
+
+
+class PreviewEncoder:
+    # Holds the newest preview frame as JPEG for the page to fetch. A new frame
+    # is only encoded once the page picked up the previous one, so a busy page
+    # never makes us encode frames nobody sees.
+    def __init__(self, quality=IMAGE_QUALITY['high']):
+        self.quality = quality
+        self.sequence = 0
+        self.encoded = 0
+        self.skipped = 0
+        self._jpeg = None
+        self._fetched = True
+
+    def offer(self, frame):
+        # Returns the sequence number of the new frame, or None if skipped
+        if not self._fetched:
+            self.skipped += 1
+            return None
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return None
+        self._jpeg = jpeg.tobytes()
+        self._fetched = False
+        self.sequence += 1
+        self.encoded += 1
+        return self.sequence
+
+    def fetch(self):
+        self._fetched = True
+        return self._jpeg
+
+
+def _create_scheme_handler(encoder):
+    from PyQt5.QtWebEngineCore import QWebEngineUrlSchemeHandler
+
+    class PreviewSchemeHandler(QWebEngineUrlSchemeHandler):
+        # Serves clapathon://preview/<sequence>.jpg as raw JPEG bytes
+        def requestStarted(self, job):
+            jpeg = encoder.fetch()
+            if jpeg is None:
+                job.fail(job.UrlNotFound)
+                return
+            buffer = QBuffer(job)
+            buffer.setData(jpeg)
+            buffer.open(QIODevice.ReadOnly)
+            job.reply(b'image/jpeg', buffer)
+
+    return PreviewSchemeHandler()
+
+
+class WebBridge(QObject):
+    # Exposed to the page as 'bridge' through QWebChannel
+    cameraStatusChanged = pyqtSignal(bool)
+    gestureTextChanged = pyqtSignal(str)
+    cameraListChanged = pyqtSignal('QVariantList')
+    screenshotTaken = pyqtSignal()
+    previewFrame = pyqtSignal(int)
+
+    def __init__(self, app, parent=None):
+        super().__init__(parent)
+        self.app = app
+
+    @pyqtSlot()
+    def toggleCamera(self):
+        self.app.toggle_camera()
+
+    @pyqtSlot(int)
+    def selectCamera(self, index):
+        self.app.select_camera(index)
+
+    @pyqtSlot('QVariant')
+    def setVolume(self, value):
+        # The page sends the slider value, 0-100, as a string
+        try:
+            self.app.set_volume_immediately(float(value) / 100)
+        except (TypeError, ValueError):
+            print(f"Invalid volume: {value}")
+
+    @pyqtSlot(str)
+    def saveSettings(self, settings):
+        try:
+            self.app.apply_settings(parse_settings(json.loads(settings)))
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Invalid settings: {e}")
+
+    @pyqtSlot()
+    def showHelp(self):
+        QMessageBox.information(None, "Help", HELP_TEXT)
+
+
+class WebUi:
+    # templates/index.html in a QWebEngineView, driven by the app through WebBridge
+    def __init__(self, app, html_path="templates/index.html"):
+        from PyQt5.QtWebChannel import QWebChannel
+        from PyQt5.QtWebEngineWidgets import QWebEngineView
+
+        self.preview = PreviewEncoder()
+        self.bridge = WebBridge(app)
+
+        self.view = QWebEngineView()
+        self.view.setWindowTitle("Clapathon")
+        self.view.resize(1280, 800)
+        page = self.view.page()
+
+        self.channel = QWebChannel(page)
+        self.channel.registerObject('bridge', self.bridge)
+        page.setWebChannel(self.channel)
+
+        self.scheme_handler = _create_scheme_handler(self.preview)
+        page.profile().installUrlSchemeHandler(PREVIEW_SCHEME, self.scheme_handler)
+
+        # scripts/ and styles/ are resolved against the project root
+        root = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(root, html_path), encoding='utf-8') as f:
+            self.view.setHtml(f.read(), QUrl.fromLocalFile(root + os.sep))
+
+    def show(self):
+        self.view.show()
+
+    def push_frame(self, frame):
+        sequence = self.preview.offer(frame)
+        if sequence is not None:
+            self.bridge.previewFrame.emit(sequence)